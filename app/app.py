@@ -1,11 +1,9 @@
 import streamlit as st
 import streamlit.components.v1 as components
 from pathlib import Path
-import base64
 import os
 import sys
 import logging
-import tempfile
 
 # Add current directory to path to ensure imports work
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -14,203 +12,27 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+import config
+import telemetry
+from collections import deque
+from theme import apply_theme
 
+# .env is read once per process; feature modules (and their heavy
+# dependencies) are imported only where a tab actually uses them
+config.load()
 
+# Prometheus-style /metrics endpoint on its own port (disabled when unset)
+if os.getenv("METRICS_PORT"):
+    telemetry.start_metrics_server(int(os.getenv("METRICS_PORT")))
 
+# Seconds between progress refreshes of a running report job
+REPORT_POLL_SECONDS = float(os.getenv("REPORT_POLL_SECONDS", "1.0"))
 
-def load_bg_image(image_path):
-    # For deployment, use Streamlit's static file serving
-    try:
-        # Try to load from assets folder relative to app.py
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        full_path = os.path.join(current_dir, "..", image_path)
-        with open(full_path, "rb") as img_file:
-            encoded = base64.b64encode(img_file.read()).decode()
-            
-        return encoded
-    except FileNotFoundError:
-        # Fallback for deployment - use a default background
-        # Create a simple gradient background
-        return ""  # Empty string will use default Streamlit background
-
-
-def apply_theme(theme):
-    if theme == "Light":
-        bg_image = load_bg_image("assets/light_bg.png")
-        text_color = "#000000"
-        chat_user_bg = "#DCF8C6"
-        chat_bot_bg = "#F1F0F0"
-        button_color = "#4CAF50"
-        button_text_color = "#ffffff"
-        tab_bg_color = "transparent"
-        tab_text_color = "red"
-    else:
-        bg_image = load_bg_image("assets/dark_bg.png")
-        text_color = "white"
-        chat_user_bg = "#e7e7e7"
-        chat_bot_bg = "#3a3a3a"
-        button_color = "#1E88E5"
-        button_text_color = "#ffffff"
-        tab_bg_color = "transparent"
-        tab_text_color = "red"
-
-    css = f"""
-    <style>
-    .stApp {{
-        background-image: url("data:image/png;base64,{bg_image}");
-        background-size: cover;
-        background-repeat: no-repeat;
-        background-attachment: fixed;
-        color: {text_color};
-    }}
-
-    /* Global text color override for all markdown and text elements */
-    .stMarkdown {{
-        color: {text_color} !important;
-    }}
-    .stMarkdown p, .stMarkdown li, .stMarkdown h1, .stMarkdown h2, .stMarkdown h3 {{
-        color: {text_color} !important;
-    }}
-    .stText {{
-        color: {text_color} !important;
-    }}
-    label {{
-        color: {text_color} !important;
-    }}
-
-    /* Tabs background and text color */
-    .stTabs [role="tablist"] button[role="tab"] {{
-        background-color: {tab_bg_color} !important;
-        color: {tab_text_color} !important;
-        border: none !important;
-        padding: 0.5rem 1rem !important;
-        margin: 0 0.25rem !important;
-        border-radius: 0.25rem !important;
-    }}
-
-    .stTabs [role="tablist"] button[role="tab"][aria-selected="true"] {{
-        background-color: transparent !important;
-        color: {tab_text_color} !important;
-        border-bottom: none !important;
-        font-weight: bold;
-    }}
-
-    .stTabs [role="tablist"] button[role="tab"]:hover {{
-        background-color: transparent !important;
-        color: {tab_text_color} !important;
-    }}
-
-    /* Chat Messages Styling - Enhanced for full visibility */
-    .stChatMessage {{
-        background-color: transparent;
-    }}
-    .stChatMessage * {{
-        color: {text_color} !important;
-    }}
-    .stChatMessage [data-testid="chatAvatarIcon-user"] {{
-        background-color: {button_color};
-    }}
-    .stChatMessage [data-testid="chatAvatarIcon-assistant"] {{
-        background-color: {button_color};
-    }}
-
-    /* Ensure text is visible in both themes - Expanded */
-    .stChatMessage .stMarkdown p {{
-        color: {text_color} !important;
-        font-size: 16px;
-        line-height: 1.5;
-    }}
-
-    /* Input and form elements styling for visibility */
-    .stChatInput {{
-        background-color: rgba(255, 255, 255, 0.1) !important;
-        border: 1px solid rgba(255, 255, 255, 0.2) !important;
-        color: {text_color} !important;
-    }}
-    .stChatInput input {{
-        color: {text_color} !important;
-        background-color: rgba(255, 255, 255, 0.1) !important;
-    }}
-    .stTextInput > div > div > input {{
-        color: {text_color} !important;
-        background-color: rgba(255, 255, 255, 0.1) !important;
-    }}
-    .stTextArea > div > textarea {{
-        color: {text_color} !important;
-        background-color: rgba(255, 255, 255, 0.1) !important;
-    }}
-    .stSelectbox > div > div {{
-        color: {text_color} !important;
-    }}
-    .stFileUploader label {{
-        color: {text_color} !important;
-    }}
-    .stFileUploader > div > div {{
-        color: {text_color} !important;
-    }}
-
-    /* Streamlit Button Styling */
-    button[data-baseweb="button"] {{
-        background-color: {button_color} !important;
-        color: {button_text_color} !important;
-        border: none;
-        border-radius: 0.5rem;
-        padding: 0.5rem 1rem;
-        margin: 0.5rem 0;
-    }}
-
-    /* Fix label padding */
-    .block-container {{
-        padding-top: 2rem;
-        padding-bottom: 2rem;
-        padding-left: 3rem;
-        padding-right: 3rem;
-    }}
-
-    /* Sidebar styling */
-    .css-1d391kg {{
-        background-color: rgba(0, 0, 0, 0.1) !important;
-        color: {text_color} !important;
-    }}
-    .css-1d391kg * {{
-        color: {text_color} !important;
-    }}
-
-    /* Ensure all tab content text is visible */
-    section[data-testid="stHorizontalBlock"] * {{
-        color: {text_color} !important;
-    }}
-
-    /* Chat select buttons styling */
-    .stButton button[key^="select_"] {{
-        background: none !important;
-        border: none !important;
-        color: {text_color} !important;
-        text-align: left !important;
-        padding: 0 !important;
-        font-size: inherit !important;
-        width: 100% !important;
-        cursor: pointer !important;
-    }}
-    .stButton button[key^="select_"]:hover {{
-        background: rgba(255,255,255,0.1) !important;
-    }}
-
-    /* Chat delete buttons styling */
-    .stButton button[key^="delete_"] {{
-        background: none !important;
-        border: none !important;
-        color: #ff6b6b !important;
-        padding: 0 !important;
-        font-size: 16px !important;
-        cursor: pointer !important;
-    }}
-    .stButton button[key^="delete_"]:hover {{
-        background: rgba(255, 0, 0, 0.1) !important;
-    }}
-    </style>"""
-    st.markdown(css, unsafe_allow_html=True)
-
+# Spans of this script run; recent runs are kept for the debug panel, since
+# runs that call a model usually end in st.rerun()
+if "recent_traces" not in st.session_state:
+    st.session_state.recent_traces = deque(maxlen=5)
+st.session_state.recent_traces.append(telemetry.start_trace())
 
 
 # Initialize theme in session state if not exists
@@ -280,9 +102,9 @@ if "active_tab" not in st.session_state:
 tab_objects = st.tabs(tabs)
 
 with tab_objects[0]:
-    from chat import chat_with_bot
+    telemetry.set_tab("Chat")
+    from chat_context import ConversationContext
     from tts_component import speak_last_response
-    from report_translator import translate_text
 
     # Initialize chat history
     if "chat_history" not in st.session_state:
@@ -290,6 +112,10 @@ with tab_objects[0]:
             {"role": "system", "content": "You are an intelligent AI medical assistant. Answer accurately and clearly. If the user asks about analyzing medical images, translating reports, or finding hospitals, guide them to use the Image Analysis, Report Reader, or Hospital Locator tabs respectively. For other medical queries, provide direct answers without mentioning other features."}
         ]
 
+    # Token-budgeted context (rolling summary of older turns)
+    if "chat_context" not in st.session_state:
+        st.session_state.chat_context = ConversationContext()
+
     # Initialize translation state
     if "translate_last" not in st.session_state:
         st.session_state.translate_last = False
@@ -308,6 +134,7 @@ with tab_objects[0]:
                         # Translate the last assistant message
                         current_lang = st.session_state.get("language_preference", "hi")
                         lang_name = next((name for name, code in language_options if code == current_lang), "Hindi")
+                        from report_translator import translate_text
                         st.session_state.translated_last = translate_text(message["content"], dest_lang=current_lang, dest_lang_name=lang_name)
                     st.markdown(st.session_state.translated_last)
                 else:
@@ -325,8 +152,11 @@ with tab_objects[0]:
 
 # After rerun, continue here if assistant needs to reply
         if st.session_state.chat_history and st.session_state.chat_history[-1]["role"] == "user":
-            reply, _ = chat_with_bot(st.session_state.chat_history)
-            st.session_state.chat_history.append({"role": "assistant", "content": reply})
+            # Stream tokens as they arrive, then save the final text
+            from chat import stream_chat_with_bot
+            with st.chat_message("assistant"):
+                reply = st.write_stream(stream_chat_with_bot(st.session_state.chat_history, st.session_state.chat_context))
+            st.session_state.chat_history.append({"role": "assistant", "content": reply.strip()})
 
             st.rerun()
 
@@ -343,36 +173,42 @@ with tab_objects[0]:
                 st.rerun()
 
 with tab_objects[1]:
-    from image_analysis import analyze_medical_image
-
+    telemetry.set_tab("Image Analysis")
     st.subheader("🖼️ Medical Image Analysis")
 
-    uploaded_image = st.file_uploader("Upload a medical image (X-ray, tumor, skin rash)", type=["png", "jpg", "jpeg"])
-
-    if uploaded_image:
-        # Save temporarily
-        temp_path = "temp_image.jpg"
-        with open(temp_path, "wb") as f:
-            f.write(uploaded_image.getbuffer())
+    uploaded_images = st.file_uploader(
+        "Upload medical images (X-ray, tumor, skin rash) - several views of one study can be analyzed together",
+        type=["png", "jpg", "jpeg"],
+        accept_multiple_files=True
+    )
 
+    if uploaded_images:
         # Select image type
         image_type = st.selectbox("Select image type", ["X-ray", "CT Scan", "MRI Scan", "Skin Rash"])
 
-        if st.button("Analyze Image"):
-            with st.spinner("Analyzing image..."):
-                result = analyze_medical_image(temp_path, image_type)
-            st.success("Analysis Result:")
-            st.write(result)
-
-        # Display the image
-        st.image(uploaded_image, caption="Uploaded Image")
-
-        # Clean up temp file
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        label = "Analyze Image" if len(uploaded_images) == 1 else f"Analyze {len(uploaded_images)} Images"
+        if st.button(label):
+            from image_analysis import analyze_medical_images
+            progress = st.progress(0.0, text=f"Analyzing 0/{len(uploaded_images)} images...")
+            slots = []
+            for uploaded_image in uploaded_images:
+                slot = st.empty()
+                slot.info(f"⏳ Analyzing {uploaded_image.name}...")
+                slots.append(slot)
+
+            # Results are shown as each image finishes
+            images = [uploaded_image.getbuffer() for uploaded_image in uploaded_images]
+            for done, (index, result) in enumerate(analyze_medical_images(images, image_type), start=1):
+                with slots[index].container():
+                    st.success(f"Analysis Result: {uploaded_images[index].name}")
+                    st.write(result)
+                progress.progress(done / len(uploaded_images), text=f"Analyzed {done}/{len(uploaded_images)} images")
+
+        # Display the images
+        st.image(uploaded_images, caption=[f"Uploaded Image: {uploaded_image.name}" for uploaded_image in uploaded_images])
 
 with tab_objects[2]:
-    from report_translator import extract_text, translate_text
+    telemetry.set_tab("Report Reader")
     st.subheader("📄 Upload Medical Report Image")
 
     uploaded_file = st.file_uploader("Choose an image or PDF file", type=["png", "jpg", "jpeg", "pdf"])
@@ -384,27 +220,76 @@ with tab_objects[2]:
     st.info(f"🌐 Translation will be in: **{lang_name}** (Change in sidebar)")
 
     if uploaded_file:
-        # Save uploaded file to a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=uploaded_file.name) as temp_file:
-            temp_file.write(uploaded_file.getbuffer())
-            temp_file_path = temp_file.name
-
-        try:
-            with st.spinner("🔍 Extracting text from image..."):
-                extracted = extract_text(temp_file_path)
-                st.text_area("📝 Extracted Text:", extracted, height=200)
-
-            if st.button("🌐 Translate"):
-                translated = translate_text(extracted, dest_lang=current_lang, dest_lang_name=lang_name)
+        from report_jobs import DONE, FAILED, QUEUED, report_jobs
+
+        def show_job(job_id, render):
+            # Finished jobs render once; running ones refresh only this part
+            # of the page until they finish, then trigger one full rerun
+            job = report_jobs.get(job_id)
+            if job is None or job["status"] in (DONE, FAILED):
+                render(job)
+                return
+
+            @st.fragment(run_every=REPORT_POLL_SECONDS)
+            def poll():
+                job = report_jobs.get(job_id)
+                if job is None or job["status"] in (DONE, FAILED):
+                    st.rerun()
+                render(job)
+
+            poll()
+
+        def render_extraction(job):
+            if job is None:
+                st.warning("⚠️ This report is no longer cached. Please upload it again.")
+            elif job["status"] == FAILED:
+                st.error(f"❌ {job['error']}")
+            elif job["status"] == DONE:
+                st.text_area("📝 Extracted Text:", job["result"], height=200)
+            else:
+                st.info(f"🔍 Extracting text from report... ({job['elapsed']:.0f}s)")
+
+        def render_translation(job):
+            if job is None:
+                st.warning("⚠️ This translation is no longer cached. Please translate again.")
+            elif job["status"] == FAILED:
+                st.error(f"❌ Translation failed: {job['error']}")
+            elif job["status"] == DONE:
                 st.success("✅ Translated Report:")
-                st.text_area("🌍 Translation:", translated, height=200)
-        finally:
-            # Clean up the temporary file
-            if os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
+                st.text_area("🌍 Translation:", job["result"], height=200)
+            elif job["status"] == QUEUED:
+                st.info("⏳ Translation will start once the text is extracted...")
+            else:
+                step = "Simplifying" if job["stage"] == "simplify" else "Translating"
+                st.progress(job["done"] / job["total"] if job["total"] else 0.0,
+                            text=f"🌐 {step}... {job['done']}/{job['total']} parts translated")
+                if job["partial"]:
+                    st.text_area("🌍 Translation so far:", job["partial"], height=200)
+
+        # Extraction and translation run as background jobs, so slow reports
+        # don't block the page and survive reruns; the same file uploaded
+        # again (by anyone) reuses its job
+        if st.session_state.get("report_upload_id") != uploaded_file.file_id:
+            st.session_state.report_upload_id = uploaded_file.file_id
+            from report_translator import get_vision_api_key
+            st.session_state.report_job = report_jobs.submit_report(
+                uploaded_file.getbuffer(), api_key=get_vision_api_key()
+            )
+            st.session_state.report_translation_job = None
+
+        show_job(st.session_state.report_job, render_extraction)
+
+        if st.button("🌐 Translate"):
+            from report_translator import get_api_key
+            st.session_state.report_translation_job = report_jobs.submit_translation(
+                st.session_state.report_job, current_lang, lang_name, api_key=get_api_key()
+            )
+        if st.session_state.report_translation_job:
+            show_job(st.session_state.report_translation_job, render_translation)
 
 with tab_objects[3]:
-    from hospital_locator import find_nearest_hospitals
+    telemetry.set_tab("Hospital Locator")
+    from hospital_locator import find_nearest_hospitals, suggest_locations
 
     # Override input text color to black for hospital locator tab
     st.markdown("""
@@ -427,6 +312,16 @@ with tab_objects[3]:
     col1, col2 = st.columns([3, 1])
     with col1:
         location_input = st.text_input("Enter your City or Area (e.g., Mumbai, Bangalore):", key="location_input")
+
+        # Type-ahead suggestions from the offline gazetteer
+        suggestions = [name for name in suggest_locations(location_input) if name != location_input]
+        if suggestions:
+            def _use_suggestion(name):
+                st.session_state.location_input = name
+
+            suggestion_cols = st.columns(len(suggestions))
+            for i, name in enumerate(suggestions):
+                suggestion_cols[i].button(name, key=f"location_suggestion_{i}", on_click=_use_suggestion, args=(name,))
     with col2:
         use_current_location = st.checkbox("📍 Use Current Location", key="use_current_location")
 
@@ -476,3 +371,23 @@ with tab_objects[3]:
 
             # Note: Google Maps link is displayed directly in find_nearest_hospitals function
             # Users can click to open Google Maps for hospital search
+
+# Per-request timings (encode, upload, model call, simplify, translate, geocode)
+if st.sidebar.checkbox("🔍 Show request timings", key="show_timings"):
+    with st.sidebar.expander("⏱️ Recent request timings", expanded=True):
+        traces = [trace for trace in st.session_state.recent_traces if trace]
+        if traces:
+            for trace in reversed(traces):
+                st.caption(f"{sum(span['ms'] for span in trace if span['stage'] == 'model_call'):.0f} ms in model calls")
+                st.table(trace)
+        else:
+            st.caption("No timed stages yet")
+        from clients import get_connection_stats
+        connections = get_connection_stats()
+        st.caption(f"🔌 Model connections: {connections['new_connections']} new, "
+                   f"{connections['reused_connections']} reused keep-alive")
+        from cache import tiered_cache_stats
+        ratios = ", ".join(f"{name.replace('_', ' ')} {stats['hit_ratio']:.0%}"
+                           for name, stats in tiered_cache_stats().items() if stats["hits"] + stats["misses"])
+        if ratios:
+            st.caption(f"🗄️ Cache hit ratios: {ratios}")
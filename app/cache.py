@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import telemetry
+
+
+def content_hash(data) -> str:
+    """SHA-256 hex digest of bytes / bytearray / memoryview content"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class LRUCache:
+    """
+    Thread-safe in-memory cache with least-recently-used eviction.
+
+    Entries optionally expire `ttl` seconds after they were set.
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._expires: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _expired(self, key: str) -> bool:
+        expires = self._expires.get(key)
+        return expires is not None and expires <= time.monotonic()
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            if key in self._data and self._expired(key):
+                del self._data[key]
+                del self._expires[key]
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if self.ttl is not None:
+                self._expires[key] = time.monotonic() + self.ttl
+            while len(self._data) > self.maxsize:
+                evicted, _ = self._data.popitem(last=False)
+                self._expires.pop(evicted, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._expires.clear()
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._data and not self._expired(key)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+class DiskCache:
+    """
+    Persistent cache storing one JSON file per key in a directory.
+
+    Values must be JSON serializable. When the directory grows past
+    `max_entries` the least recently written files are removed.
+    """
+
+    def __init__(self, directory: str, max_entries: int = 1000):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{name}.json")
+
+    def get(self, key: str, default=None):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return default
+        if entry.get("key") != key:
+            return default
+        return entry.get("value", default)
+
+    def set(self, key: str, value: Any):
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"key": key, "value": value}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        with self._lock:
+            self._writes += 1
+            # Only scan the directory every so often
+            if self._writes % 50 == 0:
+                self._prune()
+
+    def _prune(self):
+        try:
+            entries = [os.path.join(self.directory, n) for n in os.listdir(self.directory) if n.endswith(".json")]
+        except OSError:
+            return
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda p: os.path.getmtime(p))
+        for path in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+# Named tiered caches, for tiered_cache_stats()
+_tiered_caches: Dict[str, "TieredCache"] = {}
+
+
+class TieredCache:
+    """
+    In-memory LRU in front of an optional DiskCache.
+
+    Hits are counted per tier; a named cache also exports its lookups as
+    cache_lookups_total{cache, result=memory_hit|disk_hit|miss}.
+    """
+
+    def __init__(self, maxsize: int = 128, directory: Optional[str] = None, max_disk_entries: int = 1000,
+                 name: Optional[str] = None):
+        self.memory = LRUCache(maxsize)
+        self.disk = DiskCache(directory, max_disk_entries) if directory else None
+        self.name = name
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+        if name:
+            _tiered_caches[name] = self
+
+    def _record(self, result: str):
+        with self._stats_lock:
+            if result == "memory_hit":
+                self.memory_hits += 1
+            elif result == "disk_hit":
+                self.disk_hits += 1
+            else:
+                self.misses += 1
+        if self.name:
+            telemetry.count("cache_lookups_total", cache=self.name, result=result)
+
+    def get(self, key: str, default=None):
+        value = self.memory.get(key)
+        if value is not None:
+            self._record("memory_hit")
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                # Promote to the memory tier
+                self.memory.set(key, value)
+                self._record("disk_hit")
+                return value
+        self._record("miss")
+        return default
+
+    def set(self, key: str, value: Any):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def stats(self) -> Dict[str, float]:
+        """Size of the memory tier and hit counts across both tiers"""
+        with self._stats_lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                "size": len(self.memory),
+                "maxsize": self.memory.maxsize,
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": hits / total if total else 0.0,
+                "disk": self.disk is not None,
+            }
+
+
+def tiered_cache_stats() -> Dict[str, Dict[str, float]]:
+    """stats() of every named TieredCache"""
+    return {name: cache.stats() for name, cache in _tiered_caches.items()}
@@ -1,42 +1,80 @@
 import os
-import openai
 import streamlit as st
-from dotenv import load_dotenv
+import config
 from report_translator import translate_text
+import llm_engine
+from chat_context import ConversationContext, SUMMARY_MAX_TOKENS
+from response_cache import response_cache, cacheable_question
+from model_router import get_router
 
-load_dotenv()
+config.load()
 
 # Use the Meta Llama 3.2 11B Instruct model (Vision version works for text too)
 MODEL_NAME ="meta-llama/llama-3.2-11b-vision-instruct"
+# Fallback / hedge candidates, best first (override with ROUTER_MODELS_CHAT)
+CHAT_ROUTER = get_router("chat", [MODEL_NAME, "meta-llama/llama-3.1-8b-instruct"])
 
-def get_openai_client():
-    """Get OpenAI client with proper API key handling"""
-    
-    api_key = st.secrets["OPENROUTER_API_KEY"]
-    
-    return openai.OpenAI(
-        api_key=api_key,
-        base_url="https://openrouter.ai/api/v1"
+def get_api_key():
+    """Get OpenRouter API key for chat"""
+    return st.secrets["OPENROUTER_API_KEY"]
+
+SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": "You are a medical assistant chatbot. Only answer questions related to medicine, health, or medical topics. If the query is not related to medicine, politely decline to answer and suggest asking a medical question."
+}
+
+def summarize_turns(previous_summary, turns):
+    """Fold evicted turns into the rolling conversation summary"""
+    transcript = "\n".join(f"{t['role'].capitalize()}: {t['content']}" for t in turns)
+    prompt = (
+        "Update the summary of a medical chat conversation with the new messages below. "
+        "Keep symptoms, conditions, medications, ages and advice already given. "
+        f"Answer with the updated summary only, in at most {SUMMARY_MAX_TOKENS // 2} words.\n\n"
+        f"Current summary:\n{previous_summary or '(none)'}\n\nNew messages:\n{transcript}"
     )
+    summary, _ = llm_engine.complete_routed(
+        get_api_key(),
+        CHAT_ROUTER,
+        [{"role": "user", "content": prompt}],
+        temperature=0.3,
+        max_tokens=SUMMARY_MAX_TOKENS
+    )
+    return summary
 
-def chat_with_bot(messages, target_lang=None):
-    try:
-        client = get_openai_client()
-        # Prepend system message to restrict to medical questions
-        system_message = {
-            "role": "system",
-            "content": "You are a medical assistant chatbot. Only answer questions related to medicine, health, or medical topics. If the query is not related to medicine, politely decline to answer and suggest asking a medical question."
-        }
-        messages = [system_message] + messages
-        # Send message to OpenRouter (chat format)
-        response = client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=messages,
-            temperature=0.7,
-            max_tokens=512
-        )
+def build_messages(messages, context=None):
+    """
+    Build a token-budgeted prompt with a single system message.
+
+    The medical-only instruction and any system message from the history are
+    merged into one system prompt. With a persistent ConversationContext,
+    older turns are folded into its rolling summary; without one they are
+    simply trimmed.
+    """
+    system_prompt = "\n\n".join(
+        [SYSTEM_MESSAGE["content"]] + [m["content"] for m in messages if m["role"] == "system"]
+    )
+    turns = [m for m in messages if m["role"] != "system"]
+    if context is None:
+        return ConversationContext().build(system_prompt, turns)
+    return context.build(system_prompt, turns, summarize=summarize_turns)
 
-        reply = response.choices[0].message.content.strip()
+def chat_with_bot(messages, target_lang=None, context=None):
+    try:
+        # First-turn questions are answered from the response cache when possible
+        question = cacheable_question(messages)
+        # Only answers of the primary model are served from the cache
+        reply = response_cache.get(question, CHAT_ROUTER.primary) if question else None
+        if reply is None:
+            # Send message to OpenRouter (chat format) through the async engine
+            reply, model = llm_engine.complete_routed(
+                get_api_key(),
+                CHAT_ROUTER,
+                build_messages(messages, context),
+                temperature=0.7,
+                max_tokens=512
+            )
+            if question and reply:
+                response_cache.set(question, model, reply)
 
         # Optional translation
         translated_reply = None
@@ -48,7 +86,37 @@ def chat_with_bot(messages, target_lang=None):
     except Exception as e:
         return f"❌ Error: {str(e)}", None
 
+def stream_chat_with_bot(messages, context=None):
+    """
+    Stream the assistant reply token by token.
 
+    Yields text deltas as they arrive from OpenRouter so the Chat tab can
+    render the answer immediately (e.g. with st.write_stream). Joining all
+    yielded chunks gives the same text chat_with_bot would have returned.
+    Cached first-turn answers are yielded in one piece.
+    """
+    try:
+        question = cacheable_question(messages)
+        cached = response_cache.get(question, CHAT_ROUTER.primary) if question else None
+        if cached is not None:
+            yield cached
+            return
 
-from dotenv import load_dotenv
-load_dotenv()
+        chunks = []
+        answered_by = []
+        for chunk in llm_engine.stream_routed(
+            get_api_key(),
+            CHAT_ROUTER,
+            build_messages(messages, context),
+            on_model=answered_by.append,
+            temperature=0.7,
+            max_tokens=512
+        ):
+            chunks.append(chunk)
+            yield chunk
+        # Only complete replies are cached, under the model that wrote them
+        if question and chunks:
+            response_cache.set(question, answered_by[-1], "".join(chunks))
+
+    except Exception as e:
+        yield f"❌ Error: {str(e)}"
@@ -0,0 +1,84 @@
+import os
+from typing import Callable, List, Optional
+
+# Prompt token budget for system prompt + summary + recent turns
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKENS", "3000"))
+# When over budget, trim down to this fraction so summaries aren't rebuilt every turn
+TRIM_TARGET = 0.75
+SUMMARY_MAX_TOKENS = 256
+# Per-message overhead of the chat format
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def count_tokens(text: str) -> int:
+    """Approximate token count (~4 characters per token for English text)"""
+    return max(1, (len(text) + 3) // 4)
+
+
+def message_tokens(message: dict) -> int:
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+class ConversationContext:
+    """
+    Token-budgeted view of a conversation.
+
+    Keeps one system prompt and the most recent turns that fit the budget.
+    Older turns are folded into a rolling summary, which is only extended
+    with the turns evicted since the last update, so per-turn prompt size
+    stays flat however long the conversation gets.
+    """
+
+    def __init__(self, budget: int = CONTEXT_TOKEN_BUDGET):
+        self.budget = budget
+        self.summary = ""
+        # Number of leading turns already folded into the summary
+        self.summarized_upto = 0
+
+    def _system(self, system_prompt: str) -> dict:
+        content = system_prompt
+        if self.summary:
+            content += f"\n\nSummary of the earlier conversation:\n{self.summary}"
+        return {"role": "system", "content": content}
+
+    def build(self, system_prompt: str, turns: List[dict],
+              summarize: Optional[Callable[[str, List[dict]], str]] = None) -> List[dict]:
+        """
+        Build the message list to send for the next reply.
+
+        Args:
+            system_prompt: The single system prompt
+            turns: Full user/assistant history (no system messages)
+            summarize: summarize(previous_summary, evicted_turns) -> new summary
+
+        Returns:
+            [system message (with summary)] + recent turns
+        """
+        if self.summarized_upto > len(turns):
+            # History was cleared - start over
+            self.reset()
+        start = self.summarized_upto
+        total = message_tokens(self._system(system_prompt)) + sum(message_tokens(t) for t in turns[start:])
+
+        if total > self.budget:
+            # Evict oldest turns until under the trim target, always keeping the latest turn
+            target = int(self.budget * TRIM_TARGET)
+            new_start = start
+            while total > target and new_start < len(turns) - 1:
+                total -= message_tokens(turns[new_start])
+                new_start += 1
+            evicted = turns[start:new_start]
+            if evicted:
+                if summarize is not None:
+                    try:
+                        self.summary = summarize(self.summary, evicted)
+                    except Exception:
+                        # Keep the previous summary; the turns are dropped either way
+                        pass
+                self.summarized_upto = new_start
+
+        return [self._system(system_prompt)] + turns[self.summarized_upto:]
+
+    def reset(self):
+        self.summary = ""
+        self.summarized_upto = 0
@@ -0,0 +1,143 @@
+import hashlib
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Tuple
+
+import telemetry
+
+if TYPE_CHECKING:
+    import httpx
+    import openai
+
+# Overridable for self-hosted gateways and the offline benchmarks
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+
+# Retries are done by resilience.call_with_retry, not by the SDK
+MAX_SDK_RETRIES = 0
+
+# Connection pool sizing - one pool per (API key, base URL) shared by every session
+MAX_CONNECTIONS = int(os.getenv("OPENROUTER_MAX_CONNECTIONS", "32"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENROUTER_MAX_KEEPALIVE", "16"))
+KEEPALIVE_EXPIRY = float(os.getenv("OPENROUTER_KEEPALIVE_EXPIRY", "60"))
+
+_async_clients: Dict[Tuple[str, str], "openai.AsyncOpenAI"] = {}
+_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {
+    "clients_created": 0,
+    "client_reuses": 0,
+    "requests": 0,
+    "new_connections": 0,
+    "reused_connections": 0,
+    "tls_handshakes": 0,
+}
+
+
+def _bump(name: str, amount: int = 1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+_CONNECTION_STATS = {"new": "new_connections", "reused": "reused_connections", "tls": "tls_handshakes"}
+
+
+def _connection(kind: str):
+    # Also exported as llm_connections_total{kind=new|reused|tls}
+    _bump(_CONNECTION_STATS[kind])
+    telemetry.count("llm_connections_total", kind=kind)
+
+
+async def _attach_atrace(request: "httpx.Request"):
+    # Per-request httpcore trace hook: counts new vs reused connections and
+    # times the upload of the request body
+    state = {"connected": False}
+
+    async def trace(event_name: str, info: dict):
+        if event_name == "connection.connect_tcp.complete":
+            state["connected"] = True
+            _connection("new")
+        elif event_name == "connection.start_tls.complete":
+            _connection("tls")
+        elif event_name.endswith("send_request_headers.started"):
+            _bump("requests")
+            # No TCP connect for this request means a keep-alive connection was reused
+            if not state["connected"]:
+                _connection("reused")
+            state["started"] = time.monotonic()
+        elif event_name.endswith("send_request_body.complete") and "started" in state:
+            telemetry.observe_stage("upload", time.monotonic() - state["started"])
+
+    try:
+        telemetry.count("llm_request_bytes_total", len(request.content))
+    except Exception:
+        # Streaming bodies can't be measured without consuming them
+        pass
+    request.extensions["trace"] = trace
+
+
+def _registry_key(api_key: str, base_url: str) -> Tuple[str, str]:
+    # Never keep raw API keys around as dictionary keys
+    digest = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()
+    return digest, base_url.rstrip("/")
+
+
+def _limits() -> "httpx.Limits":
+    import httpx
+    return httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+
+
+def _build_async_client(api_key: str, base_url: str) -> "openai.AsyncOpenAI":
+    # The SDK is only imported once a client is first needed
+    import openai
+    http_client = openai.DefaultAsyncHttpxClient(
+        limits=_limits(),
+        event_hooks={"request": [_attach_atrace]},
+    )
+    return openai.AsyncOpenAI(
+        api_key=api_key, base_url=base_url, http_client=http_client, max_retries=MAX_SDK_RETRIES
+    )
+
+
+def get_async_client(api_key: str, base_url: str = OPENROUTER_BASE_URL) -> "openai.AsyncOpenAI":
+    """
+    Return the process-wide AsyncOpenAI client for an API key and base URL.
+
+    Clients are created once and reused by every Streamlit session, so their
+    keep-alive connection pools (and TLS sessions) survive across calls.
+    Async clients are bound to the event loop they are first used on, so
+    they must only be used from the shared llm_engine loop.
+    """
+    key = _registry_key(api_key, base_url)
+    client = _async_clients.get(key)
+    if client is not None:
+        _bump("client_reuses")
+        return client
+
+    with _lock:
+        client = _async_clients.get(key)
+        if client is None:
+            client = _build_async_client(api_key, base_url)
+            _async_clients[key] = client
+            _bump("clients_created")
+        else:
+            _bump("client_reuses")
+    return client
+
+
+def get_connection_stats() -> Dict[str, int]:
+    """
+    Snapshot of client registry and connection pool counters.
+
+    `reused_connections` is the number of requests that went out on an
+    already-open keep-alive connection instead of a new TCP/TLS handshake.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["pooled_clients"] = len(_async_clients)
+    return stats
@@ -0,0 +1,21 @@
+import threading
+
+_loaded = False
+_lock = threading.Lock()
+
+
+def load():
+    """
+    Load .env into the environment, once per process.
+
+    Safe to call from every module that needs configuration; only the
+    first call reads the file.
+    """
+    global _loaded
+    if _loaded:
+        return
+    with _lock:
+        if not _loaded:
+            from dotenv import load_dotenv
+            load_dotenv()
+            _loaded = True
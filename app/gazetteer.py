@@ -0,0 +1,148 @@
+import bisect
+import mmap
+import os
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional
+
+# Bundled TSV of Indian cities / areas: key, name, state, latitude, longitude.
+# GAZETTEER_PATH can point at a larger file in the same format.
+DEFAULT_GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "gazetteer.tsv")
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", DEFAULT_GAZETTEER_PATH)
+
+# Minimum trigram similarity for a fuzzy match ("bangalor" -> "bangalore")
+FUZZY_THRESHOLD = 0.55
+
+_NON_WORD = re.compile(r'[^\w\s]')
+_WHITESPACE = re.compile(r'\s+')
+
+
+class Place(NamedTuple):
+    name: str
+    state: str
+    latitude: float
+    longitude: float
+
+
+def normalize_name(text: str) -> str:
+    """Lowercase, strip accents/punctuation and collapse whitespace"""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = _NON_WORD.sub(" ", text.lower())
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def _trigrams(key: str) -> set:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Gazetteer:
+    """
+    Memory-mapped place-name index.
+
+    Only the keys and row offsets are held in Python objects; row data stays
+    in the mapped file and is parsed on demand. Keys are kept sorted for
+    prefix (type-ahead) search, and a trigram index handles misspellings.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        rows = []
+        offset = 0
+        for line in iter(self._mm.readline, b""):
+            if line.strip() and not line.startswith(b"#"):
+                key = line.split(b"\t", 1)[0].decode("utf-8")
+                rows.append((key, offset))
+            offset += len(line)
+        rows.sort()
+        self._keys: List[str] = [key for key, _ in rows]
+        self._offsets: List[int] = [off for _, off in rows]
+        self._trigram_index: Dict[str, List[int]] = defaultdict(list)
+        for row_id, key in enumerate(self._keys):
+            for gram in _trigrams(key):
+                self._trigram_index[gram].append(row_id)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _row(self, row_id: int) -> Place:
+        start = self._offsets[row_id]
+        end = self._mm.find(b"\n", start)
+        fields = self._mm[start:end if end != -1 else len(self._mm)].decode("utf-8").rstrip("\r").split("\t")
+        return Place(fields[1], fields[2], float(fields[3]), float(fields[4]))
+
+    def lookup(self, name: str) -> Optional[Place]:
+        """Exact (normalized) name lookup"""
+        key = normalize_name(name)
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return self._row(i)
+        return None
+
+    def suggest(self, prefix: str, limit: int = 5) -> List[Place]:
+        """Places whose name starts with prefix, for type-ahead"""
+        key = normalize_name(prefix)
+        if not key:
+            return []
+        results, seen = [], set()
+        i = bisect.bisect_left(self._keys, key)
+        while i < len(self._keys) and self._keys[i].startswith(key) and len(results) < limit * 3:
+            place = self._row(i)
+            # Aliases (e.g. Bangalore / Bengaluru) point at the same place
+            if place.name not in seen:
+                seen.add(place.name)
+                results.append(place)
+            i += 1
+        # Places matched by their current name rank above alias matches
+        results.sort(key=lambda place: not normalize_name(place.name).startswith(key))
+        return results[:limit]
+
+    def fuzzy(self, name: str, threshold: float = FUZZY_THRESHOLD) -> Optional[Place]:
+        """Best trigram (Jaccard) match above threshold"""
+        key = normalize_name(name)
+        grams = _trigrams(key)
+        counts: Dict[int, int] = defaultdict(int)
+        for gram in grams:
+            for row_id in self._trigram_index.get(gram, ()):
+                counts[row_id] += 1
+        best, best_score = None, threshold
+        for row_id, shared in counts.items():
+            score = shared / (len(grams) + len(_trigrams(self._keys[row_id])) - shared)
+            if score >= best_score:
+                best, best_score = row_id, score
+        return self._row(best) if best is not None else None
+
+    def resolve(self, query: str) -> Optional[Place]:
+        """
+        Resolve free-text location input to a place.
+
+        Tries the full text, then the first (most specific) comma-separated
+        part ("Andheri, Mumbai"), then a fuzzy match of that part for
+        misspellings. Broader parts are never used on their own: "Sector 62,
+        Noida" must not resolve to Noida's centre, so unknown areas return
+        None and are geocoded instead.
+        """
+        place = self.lookup(query)
+        if place:
+            return place
+        parts = [p for p in query.split(",") if p.strip()]
+        specific = parts[0] if parts else query
+        return self.lookup(specific) or self.fuzzy(specific)
+
+
+_gazetteer: Optional[Gazetteer] = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Optional[Gazetteer]:
+    """Shared gazetteer, loaded on first use (None if the file is missing)"""
+    global _gazetteer
+    with _gazetteer_lock:
+        if _gazetteer is None and os.path.exists(GAZETTEER_PATH):
+            _gazetteer = Gazetteer(GAZETTEER_PATH)
+        return _gazetteer
@@ -0,0 +1,136 @@
+import csv
+import math
+import os
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Bundled sample of major hospitals. Point HOSPITALS_PATH at a full export
+# (same columns) for country-wide coverage.
+DEFAULT_HOSPITALS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "hospitals.csv")
+HOSPITALS_PATH = os.getenv("HOSPITALS_PATH", DEFAULT_HOSPITALS_PATH)
+
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEGREE = 111320.0
+# Grid cell size in degrees (~11 km at the equator)
+DEFAULT_CELL_DEGREES = 0.1
+
+
+def haversine_m(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Vectorized great-circle distance in meters from one point to many"""
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class HospitalIndex:
+    """
+    Uniform lat/lon grid index over hospital locations.
+
+    Points are sorted by grid cell so each cell is a contiguous slice of the
+    coordinate arrays. A radius query only computes haversine distances for
+    the cells overlapping the search circle.
+    """
+
+    def __init__(self, records: List[Dict], cell_degrees: float = DEFAULT_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        lats = np.array([float(r["latitude"]) for r in records], dtype=np.float64)
+        lons = np.array([float(r["longitude"]) for r in records], dtype=np.float64)
+        rows, cols = self._cells(lats, lons)
+        order = np.lexsort((cols, rows))
+
+        self.records = [records[i] for i in order]
+        self.lats, self.lons = lats[order], lons[order]
+        self.categories = np.array([r.get("category", "") for r in self.records])
+        self.emergency = np.array([r.get("emergency", "") == "yes" for r in self.records], dtype=bool)
+        self.open_24h = np.array([r.get("open_24h", "") == "yes" for r in self.records], dtype=bool)
+
+        # Cell -> (start, end) slice of the sorted arrays
+        self._slices: Dict[tuple, tuple] = {}
+        rows, cols = rows[order], cols[order]
+        if len(order):
+            boundaries = np.flatnonzero((np.diff(rows) != 0) | (np.diff(cols) != 0)) + 1
+            starts = np.concatenate(([0], boundaries))
+            ends = np.concatenate((boundaries, [len(order)]))
+            for start, end in zip(starts, ends):
+                self._slices[(int(rows[start]), int(cols[start]))] = (int(start), int(end))
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _cells(self, lats, lons):
+        return (np.floor(lats / self.cell_degrees).astype(np.int64),
+                np.floor(lons / self.cell_degrees).astype(np.int64))
+
+    def _type_mask(self, candidates: np.ndarray, hospital_type: str) -> np.ndarray:
+        if hospital_type == "emergency":
+            return self.emergency[candidates]
+        if hospital_type == "24+hour+hospital":
+            return self.open_24h[candidates]
+        if hospital_type == "general+hospital":
+            return self.categories[candidates] == "general"
+        if hospital_type == "specialized+hospital":
+            return self.categories[candidates] == "specialized"
+        return np.ones(len(candidates), dtype=bool)
+
+    def query(self, lat: float, lon: float, radius: float = 5000,
+              limit: int = 10, hospital_type: str = "hospital") -> List[Dict]:
+        """
+        Nearest hospitals within a radius.
+
+        Args:
+            lat, lon: Search center
+            radius: Search radius in meters
+            limit: Maximum number of results
+            hospital_type: Hospital Locator type filter value
+
+        Returns:
+            Records sorted by distance, each with an added `distance_m`
+        """
+        lat_span = radius / METERS_PER_DEGREE
+        lon_span = radius / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+        row_lo, col_lo = (int(v) for v in np.floor(np.array([lat - lat_span, lon - lon_span]) / self.cell_degrees))
+        row_hi, col_hi = (int(v) for v in np.floor(np.array([lat + lat_span, lon + lon_span]) / self.cell_degrees))
+
+        pieces = []
+        for row in range(row_lo, row_hi + 1):
+            for col in range(col_lo, col_hi + 1):
+                span = self._slices.get((row, col))
+                if span:
+                    pieces.append(np.arange(span[0], span[1]))
+        if not pieces:
+            return []
+        candidates = np.concatenate(pieces)
+        candidates = candidates[self._type_mask(candidates, hospital_type)]
+        if not len(candidates):
+            return []
+
+        distances = haversine_m(lat, lon, self.lats[candidates], self.lons[candidates])
+        within = distances <= radius
+        candidates, distances = candidates[within], distances[within]
+        if len(candidates) > limit:
+            nearest = np.argpartition(distances, limit)[:limit]
+            candidates, distances = candidates[nearest], distances[nearest]
+        order = np.argsort(distances)
+
+        return [dict(self.records[candidates[i]], distance_m=float(distances[i])) for i in order]
+
+
+def load_hospitals(path: str) -> List[Dict]:
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+_index: Optional[HospitalIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_hospital_index() -> Optional[HospitalIndex]:
+    """Shared hospital index, built on first use (None if no dataset)"""
+    global _index
+    with _index_lock:
+        if _index is None and os.path.exists(HOSPITALS_PATH):
+            _index = HospitalIndex(load_hospitals(HOSPITALS_PATH))
+        return _index
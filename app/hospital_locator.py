@@ -1,7 +1,26 @@
 import streamlit as st
+import os
+import re
 import urllib.parse
+from functools import lru_cache
 from typing import List, Tuple, Dict, Optional
-import time
+
+from cache import TieredCache
+from gazetteer import get_gazetteer
+from rate_limit import TokenBucket
+import telemetry
+
+# Geocoding results by normalized address; set GEOCODE_CACHE_DIR to persist them
+_geocode_cache = TieredCache(
+    maxsize=int(os.getenv("GEOCODE_CACHE_SIZE", "1024")),
+    directory=os.getenv("GEOCODE_CACHE_DIR") or None,
+    max_disk_entries=int(os.getenv("GEOCODE_CACHE_DISK_SIZE", "50000")),
+    name="geocode"
+)
+
+# Nominatim usage policy: at most 1 request per second for the whole process
+_nominatim_bucket = TokenBucket(rate=1.0, capacity=1.0)
+GEOCODE_QUEUE_TIMEOUT = 10
 
 def get_current_location() -> Optional[Tuple[float, float]]:
     """
@@ -16,27 +35,50 @@ def get_current_location() -> Optional[Tuple[float, float]]:
         st.error(f"Error getting current location: {e}")
         return None
 
+def normalize_address(address: str) -> str:
+    """Normalize an address for cache lookups ("  Mumbai, " -> "mumbai")"""
+    address = re.sub(r'\s*,\s*', ', ', address.strip().lower())
+    return re.sub(r'\s+', ' ', address).strip(' ,.')
+
+
+@lru_cache(maxsize=1)
+def _get_geolocator():
+    """Shared Nominatim instance"""
+    from geopy.geocoders import Nominatim
+    return Nominatim(user_agent="medical_chatbot")
+
+
 def get_location_from_address(address: str) -> Optional[Tuple[float, float]]:
     """
     Convert address to coordinates using Nominatim (OpenStreetMap).
 
+    Results are cached by normalized address, and lookups that miss the cache
+    go through a shared token bucket that keeps the whole process within
+    Nominatim's 1 request/second policy.
+
     Args:
         address: Address string to geocode
 
     Returns:
         Tuple of (latitude, longitude) or None if geocoding fails
     """
-    try:
-        from geopy.geocoders import Nominatim
-        # Initialize Nominatim geocoder
-        geolocator = Nominatim(user_agent="medical_chatbot")
+    key = normalize_address(address)
+    cached = _geocode_cache.get(key)
+    if cached is not None:
+        return tuple(cached)
 
-        # Add delay to respect rate limits
-        time.sleep(1)
+    try:
+        # Only waits when another lookup used the quota within the last second
+        if not _nominatim_bucket.acquire(timeout=GEOCODE_QUEUE_TIMEOUT):
+            st.error("Location service is busy. Please try again in a moment.")
+            return None
 
-        location = geolocator.geocode(address, timeout=10)
+        with telemetry.span("geocode"):
+            location = _get_geolocator().geocode(address, timeout=10)
         if location:
-            return location.latitude, location.longitude
+            coordinates = (location.latitude, location.longitude)
+            _geocode_cache.set(key, list(coordinates))
+            return coordinates
         else:
             st.error(f"Could not find coordinates for: {address}")
             return None
@@ -45,6 +87,60 @@ def get_location_from_address(address: str) -> Optional[Tuple[float, float]]:
         st.error(f"Error geocoding address: {e}")
         return None
 
+def resolve_location(address: str) -> Optional[Tuple[float, float]]:
+    """
+    Resolve a city/area name to coordinates, offline first.
+
+    The bundled gazetteer answers known Indian cities and areas locally;
+    only unknown places fall back to Nominatim.
+    """
+    gazetteer = get_gazetteer()
+    place = gazetteer.resolve(address) if gazetteer else None
+    if place:
+        return place.latitude, place.longitude
+    return get_location_from_address(address)
+
+
+def suggest_locations(prefix: str, limit: int = 5) -> List[str]:
+    """Type-ahead suggestions ("Name, State") for the location input"""
+    gazetteer = get_gazetteer()
+    if not gazetteer or len(prefix.strip()) < 2:
+        return []
+    return [f"{place.name}, {place.state}" for place in gazetteer.suggest(prefix, limit)]
+
+
+def show_hospital_results(hospitals: List[Dict], center: Tuple[float, float], radius: int):
+    """
+    Display nearby hospitals as a list and on an interactive map.
+
+    Args:
+        hospitals: Results from the hospital index, nearest first
+        center: Search center (latitude, longitude)
+        radius: Search radius in meters
+    """
+    if not hospitals:
+        st.info(f"No hospitals in our local directory within {radius // 1000} km. Try a larger radius or Google Maps below.")
+        return
+
+    import folium
+    from streamlit_folium import st_folium
+
+    st.subheader(f"🏥 {len(hospitals)} hospital(s) within {radius // 1000} km")
+    for hospital in hospitals:
+        st.markdown(f"- **{hospital['name']}**, {hospital.get('city', '')} — {hospital['distance_m'] / 1000:.1f} km")
+
+    hospital_map = folium.Map(location=center, zoom_start=12)
+    folium.Circle(center, radius=radius, fill=False).add_to(hospital_map)
+    folium.Marker(center, tooltip="Search location", icon=folium.Icon(color="blue")).add_to(hospital_map)
+    for hospital in hospitals:
+        folium.Marker(
+            (float(hospital["latitude"]), float(hospital["longitude"])),
+            tooltip=f"{hospital['name']} ({hospital['distance_m'] / 1000:.1f} km)",
+            icon=folium.Icon(color="red", icon="plus")
+        ).add_to(hospital_map)
+    st_folium(hospital_map, height=400, use_container_width=True, returned_objects=[])
+
+
 def show_google_maps_link(location: str, hospital_type: str = "hospital"):
     """
     Display a link to Google Maps for hospital search.
@@ -95,18 +191,23 @@ def show_google_maps_link(location: str, hospital_type: str = "hospital"):
     st.info(f"💡 **How to use:** Click the button above to open Google Maps in a new tab. The map will automatically search for {type_display.lower()} in your specified location.")
 
 def find_nearest_hospitals(location_input: str = "", use_current_location: bool = False,
-                          radius: int = 5000, hospital_type: str = "hospital") -> Tuple[List[Dict], Optional[Tuple[float, float]]]:
+                          radius: int = 5000, hospital_type: str = "hospital",
+                          limit: int = 10) -> Tuple[List[Dict], Optional[Tuple[float, float]]]:
     """
-    Main function to find nearest hospitals using Google Maps embed.
+    Main function to find nearest hospitals.
+
+    Nearby facilities come from the local hospital index; a Google Maps
+    search link is always shown as well.
 
     Args:
         location_input: Address or city name (used if not using current location)
         use_current_location: Whether to use browser geolocation
-        radius: Search radius in meters (not used with Google Maps embed)
+        radius: Search radius in meters
         hospital_type: Type of hospital to search for
+        limit: Maximum number of hospitals returned
 
     Returns:
-        Tuple of (empty_list, center_coordinates)
+        Tuple of (hospitals sorted by distance, center_coordinates)
     """
     # Determine location to search from
     if use_current_location:
@@ -122,7 +223,7 @@ def find_nearest_hospitals(location_input: str = "", use_current_location: bool
             if not location_input:
                 return [], None
             # Try geocoding but don't fail if it doesn't work
-            lat, lng = get_location_from_address(location_input) or (None, None)
+            lat, lng = resolve_location(location_input) or (None, None)
             location_name = location_input
     else:
         if not location_input:
@@ -130,10 +231,19 @@ def find_nearest_hospitals(location_input: str = "", use_current_location: bool
             return [], None
 
         # Try geocoding but don't fail if it doesn't work
-        lat, lng = get_location_from_address(location_input) or (None, None)
+        lat, lng = resolve_location(location_input) or (None, None)
         location_name = location_input
 
+    hospitals = []
+    center = (lat, lng) if lat and lng else None
+    # numpy and the hospital directory are loaded on the first search
+    from hospital_index import get_hospital_index
+    index = get_hospital_index()
+    if center and index:
+        hospitals = index.query(lat, lng, radius=radius, limit=limit, hospital_type=hospital_type)
+        show_hospital_results(hospitals, center, radius)
+
     # Always display Google Maps link, even if geocoding failed
     show_google_maps_link(location_name, hospital_type)
 
-    return [], (lat, lng) if lat and lng else None
+    return hospitals, center
@@ -1,69 +1,172 @@
-import openai
-import base64
 import os
 import streamlit as st
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
+import config
 from report_translator import translate_text
+import llm_engine
+from cache import TieredCache, content_hash
+from model_router import get_router
+import telemetry
+from utils import read_source
 
-load_dotenv()
+config.load()
 
-def get_openai_client():
-    """Get OpenAI client with proper API key handling"""
-    
-    api_key = st.secrets["OPENROUTER_API_KEY"]
-    
+# Images of a batch preprocessed concurrently (vision calls then run on the engine loop)
+IMAGE_ANALYSIS_WORKERS = int(os.getenv("IMAGE_ANALYSIS_WORKERS", "4"))
 
-    return openai.OpenAI(
-        api_key=api_key,
-        base_url="https://openrouter.ai/api/v1"
+# Use GPT-4o for vision
+VISION_MODEL = "meta-llama/llama-3.2-11b-vision-instruct"
+# Fallback / hedge candidates, best first (override with ROUTER_MODELS_VISION)
+VISION_ROUTER = get_router("vision", [VISION_MODEL, "openai/gpt-4o-mini"])
+
+# 🗄️ Analyses keyed by preprocessed image hash, image type, model and language -
+# shared between sessions. Set IMAGE_ANALYSIS_CACHE_DIR to also persist to disk.
+_analysis_cache = TieredCache(
+    maxsize=int(os.getenv("IMAGE_ANALYSIS_CACHE_SIZE", "256")),
+    directory=os.getenv("IMAGE_ANALYSIS_CACHE_DIR") or None,
+    name="image_analysis"
+)
+
+def get_api_key():
+    """Get OpenRouter API key for image analysis"""
+    return st.secrets["OPENROUTER_API_KEY"]
+
+def _cache_key(image_hash, image_type, model, target_lang=None):
+    return f"{image_hash}:{image_type}:{model}:{target_lang or ''}"
+
+def _prepare(image, image_type, target_lang=None):
+    """
+    Preprocess an image and look it up in the cache.
+
+    Only analyses by the router's primary model are served from the cache;
+    a fallback model's answer is stored under its own name.
+
+    Returns:
+        (image hash, cached analysis or None, chat messages for the model)
+    """
+    # PIL is only loaded once an image is analyzed
+    from image_preprocessing import preprocess_image, to_data_url
+
+    # Downscale, strip metadata and encode with the real MIME type
+    image_bytes, mime = preprocess_image(read_source(image))
+
+    image_hash = content_hash(image_bytes)
+    cached = _analysis_cache.get(_cache_key(image_hash, image_type, VISION_ROUTER.primary, target_lang))
+    if cached is not None:
+        return image_hash, cached, None
+
+    image_url = to_data_url(image_bytes, mime)
+
+    # Create prompt based on image type
+    if image_type == "X-ray":
+        prompt = "You are a radiologist analyzing an X-ray image. Identify any fractures, dislocations, or abnormalities in bones and joints. Describe the affected areas precisely, assess severity, and provide medical insights. Note: This is not a diagnosis - consult a healthcare professional."
+    elif image_type == "CT Scan":
+        prompt = "You are a radiologist analyzing a CT scan image. Identify any abnormalities in organs, tissues, or structures. Describe findings in detail, assess potential conditions, and provide medical insights. Note: This is not a diagnosis - consult a healthcare professional."
+    elif image_type == "MRI Scan":
+        prompt = "You are a radiologist analyzing an MRI scan image. Identify any abnormalities in soft tissues, brain, spine, or joints. Describe findings in detail, assess potential conditions, and provide medical insights. Note: This is not a diagnosis - consult a healthcare professional."
+    elif image_type == "Skin Rash":
+        prompt = "You are a dermatologist analyzing a skin condition image. Describe the rash appearance, distribution, and characteristics. Suggest possible causes and provide general treatment recommendations. Note: This is not a diagnosis - consult a healthcare professional."
+    else:
+        prompt = "Describe this medical image in detail and provide any relevant medical observations."
+
+    messages = [
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": prompt},
+                {"type": "image_url", "image_url": {"url": image_url}}
+            ]
+        }
+    ]
+
+    return image_hash, None, messages
+
+def _vision_call(messages):
+    """Coroutine asking the vision router for an analysis; resolves to (reply, model)"""
+    return llm_engine.acomplete_routed(
+        get_api_key(),
+        VISION_ROUTER,
+        messages,
+        temperature=0.7,
+        max_tokens=512
     )
 
-def analyze_medical_image(image_path, image_type, target_lang=None):
-    try:
-        client = get_openai_client()
-        # Encode image to base64
-        with open(image_path, "rb") as image_file:
-            base64_image = base64.b64encode(image_file.read()).decode('utf-8')
-
-        # Use GPT-4o for vision
-        vision_model = "meta-llama/llama-3.2-11b-vision-instruct"
-
-        # Create prompt based on image type
-        if image_type == "X-ray":
-            prompt = "You are a radiologist analyzing an X-ray image. Identify any fractures, dislocations, or abnormalities in bones and joints. Describe the affected areas precisely, assess severity, and provide medical insights. Note: This is not a diagnosis - consult a healthcare professional."
-        elif image_type == "CT Scan":
-            prompt = "You are a radiologist analyzing a CT scan image. Identify any abnormalities in organs, tissues, or structures. Describe findings in detail, assess potential conditions, and provide medical insights. Note: This is not a diagnosis - consult a healthcare professional."
-        elif image_type == "MRI Scan":
-            prompt = "You are a radiologist analyzing an MRI scan image. Identify any abnormalities in soft tissues, brain, spine, or joints. Describe findings in detail, assess potential conditions, and provide medical insights. Note: This is not a diagnosis - consult a healthcare professional."
-        elif image_type == "Skin Rash":
-            prompt = "You are a dermatologist analyzing a skin condition image. Describe the rash appearance, distribution, and characteristics. Suggest possible causes and provide general treatment recommendations. Note: This is not a diagnosis - consult a healthcare professional."
-        else:
-            prompt = "Describe this medical image in detail and provide any relevant medical observations."
-
-        messages = [
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": prompt},
-                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}}
-                ]
-            }
-        ]
-
-        response = client.chat.completions.create(
-            model=vision_model,
-            messages=messages,
-            temperature=0.7,
-            max_tokens=512
-        )
-
-        reply = response.choices[0].message.content.strip()
-
-        # Optional translation
-        if target_lang:
-            reply = translate_text(reply, target_lang)
-
-        return reply
+def _finish(image_hash, image_type, answer, target_lang=None):
+    reply, model = answer
+    # Optional translation
+    if target_lang:
+        reply = translate_text(reply, target_lang)
+
+    # Errors are raised before this point, so only real analyses are cached
+    _analysis_cache.set(_cache_key(image_hash, image_type, model, target_lang), reply)
+    return reply
 
+def _error(e):
+    return f"❌ Error analyzing image: {str(e)}"
+
+def analyze_medical_image(image, image_type, target_lang=None):
+    """
+    Analyze a medical image with the vision model.
+
+    `image` may be a file path, bytes, a memoryview such as
+    uploaded_file.getbuffer(), or a file-like object. Results are cached,
+    so re-analyzing the same image costs no model call.
+    """
+    try:
+        image_hash, cached, messages = _prepare(image, image_type, target_lang)
+        if cached is not None:
+            return cached
+        answer = llm_engine.wait(llm_engine.submit(_vision_call(messages)))
+        return _finish(image_hash, image_type, answer, target_lang)
     except Exception as e:
-        return f"❌ Error analyzing image: {str(e)}"
+        return _error(e)
+
+def analyze_medical_images(images, image_type, target_lang=None, max_workers=None):
+    """
+    Analyze a series of images (e.g. several views of one study) concurrently.
+
+    Images are preprocessed on a bounded worker pool; each vision call is
+    submitted to the engine from the calling thread as soon as its image is
+    ready, so a batch takes about as long as its slowest image and a
+    Streamlit rerun cancels the calls still in flight.
+
+    Args:
+        images: Images in any form accepted by analyze_medical_image
+        image_type: Image type shared by the whole batch
+        target_lang: Optional language code to translate each result to
+        max_workers: Concurrent preprocessing jobs (defaults to IMAGE_ANALYSIS_WORKERS)
+
+    Yields:
+        (index, result) tuples in completion order, index being the
+        position of the image in `images`
+    """
+    images = list(images)
+    if not images:
+        return
+
+    workers = max(1, min(max_workers or IMAGE_ANALYSIS_WORKERS, len(images)))
+    executor = ThreadPoolExecutor(max_workers=workers)
+    # future -> (image index, image hash); the hash is None while preprocessing.
+    # Each submit gets its own context copy: they run in parallel
+    in_flight = {executor.submit(telemetry.propagating(_prepare), image, image_type, target_lang): (index, None)
+                 for index, image in enumerate(images)}
+    try:
+        while in_flight:
+            for future in llm_engine.wait_first(in_flight):
+                index, image_hash = in_flight.pop(future)
+                try:
+                    if image_hash is None:
+                        image_hash, cached, messages = future.result()
+                        if cached is None:
+                            in_flight[llm_engine.submit(_vision_call(messages))] = (index, image_hash)
+                            continue
+                        result = cached
+                    else:
+                        result = _finish(image_hash, image_type, future.result(), target_lang)
+                except Exception as e:
+                    result = _error(e)
+                yield index, result
+    finally:
+        for future in in_flight:
+            future.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
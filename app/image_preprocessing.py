@@ -0,0 +1,91 @@
+import base64
+import io
+import os
+from typing import Tuple
+
+from PIL import Image, ImageOps
+
+import telemetry
+
+# Longest side sent to vision models; larger images are downscaled
+MAX_IMAGE_SIDE = int(os.getenv("IMAGE_MAX_SIDE", "1568"))
+JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+
+MIME_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png"}
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    """Convert to RGB / L, compositing any transparency onto white"""
+    if image.mode in ("RGB", "L"):
+        return image
+    if image.mode == "P":
+        image = image.convert("RGBA")
+    if image.mode in ("RGBA", "LA"):
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    if image.mode in ("I;16", "I", "F"):
+        # 16-bit / float grayscale (common for medical exports): map the real
+        # value range onto 0-255 first, since convert("L") clips above 255
+        if image.mode == "I;16":
+            image = image.convert("I")
+        lo, hi = image.getextrema()
+        scale = 255 / (hi - lo) if hi > lo else 0
+        return image.point(lambda v: (v - lo) * scale).convert("L")
+    return image.convert("RGB")
+
+
+def _encode(image: Image.Image, fmt: str, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    if fmt == "JPEG":
+        image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    else:
+        image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def preprocess_image(data: bytes, max_side: int = None, quality: int = None) -> Tuple[bytes, str]:
+    """
+    Prepare an uploaded image for a vision model.
+
+    Applies EXIF orientation, caps the longest side, flattens transparency and
+    re-encodes without metadata. Images are sent as JPEG, except PNG sources
+    (screenshots, scanned text) that stay smaller as optimized PNG.
+
+    Args:
+        data: Raw image bytes
+        max_side: Longest side in pixels (defaults to IMAGE_MAX_SIDE)
+        quality: JPEG quality (defaults to IMAGE_JPEG_QUALITY)
+
+    Returns:
+        Tuple of (encoded bytes, MIME type)
+    """
+    max_side = max_side or MAX_IMAGE_SIDE
+    quality = quality or JPEG_QUALITY
+
+    with telemetry.span("encode"):
+        encoded, fmt = _preprocess(data, max_side, quality)
+    telemetry.count("image_bytes_total", len(data), direction="in")
+    telemetry.count("image_bytes_total", len(encoded), direction="out")
+    return encoded, MIME_TYPES[fmt]
+
+
+def _preprocess(data: bytes, max_side: int, quality: int) -> Tuple[bytes, str]:
+    with Image.open(io.BytesIO(data)) as source:
+        source_format = source.format
+        image = ImageOps.exif_transpose(source)
+        if max(image.size) > max_side:
+            image.thumbnail((max_side, max_side), Image.LANCZOS)
+        image = _flatten(image)
+
+        encoded, fmt = _encode(image, "JPEG", quality), "JPEG"
+        if source_format == "PNG":
+            png = _encode(image, "PNG", quality)
+            if len(png) < len(encoded):
+                encoded, fmt = png, "PNG"
+    return encoded, fmt
+
+
+def to_data_url(data: bytes, mime: str) -> str:
+    """Base64 data URL for an image_url message part"""
+    return f"data:{mime};base64,{base64.b64encode(data).decode('utf-8')}"
@@ -0,0 +1,352 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, TimeoutError as FutureTimeoutError
+from concurrent.futures import wait as wait_futures
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from clients import OPENROUTER_BASE_URL, get_async_client
+from model_router import ModelRouter
+from resilience import call_with_retry
+import telemetry
+
+# Maximum concurrent in-flight requests per model across all sessions
+MAX_CONCURRENCY_PER_MODEL = int(os.getenv("LLM_MAX_CONCURRENCY_PER_MODEL", "8"))
+# How often a waiting Streamlit script checks for a rerun / stop request
+POLL_INTERVAL = 0.1
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+# Only touched from the engine loop thread
+_semaphores: Dict[str, asyncio.Semaphore] = {}
+# In-flight futures per Streamlit session, for explicit cancellation
+_inflight: Dict[str, Set[Future]] = {}
+_inflight_lock = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared event loop, starting its thread on first use"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_loop.run_forever, name="llm-engine", daemon=True)
+            thread.start()
+        return _loop
+
+
+def _semaphore(model: str) -> asyncio.Semaphore:
+    semaphore = _semaphores.get(model)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(MAX_CONCURRENCY_PER_MODEL)
+        _semaphores[model] = semaphore
+    return semaphore
+
+
+def _session_id() -> Optional[str]:
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else None
+
+
+def _track(future: Future) -> Future:
+    session_id = _session_id()
+    if session_id is None:
+        return future
+    with _inflight_lock:
+        _inflight.setdefault(session_id, set()).add(future)
+
+    def _untrack(done):
+        with _inflight_lock:
+            futures = _inflight.get(session_id)
+            if futures is not None:
+                futures.discard(done)
+                if not futures:
+                    del _inflight[session_id]
+
+    future.add_done_callback(_untrack)
+    return future
+
+
+def _yield_to_streamlit():
+    # Any st.session_state access checks for pending rerun / stop requests
+    # and raises Streamlit's control-flow exception if there is one
+    "_llm_engine_poll" in st.session_state
+
+
+def submit(coro) -> Future:
+    """Schedule a coroutine on the engine loop and return a concurrent Future"""
+    # Spans recorded on the loop keep the caller's tab label and trace
+    return _track(asyncio.run_coroutine_threadsafe(telemetry.bind(coro), get_loop()))
+
+
+def wait(future: Future):
+    """
+    Block until a future finishes, cancelling it if the script is interrupted.
+
+    Inside a Streamlit script run, touching st.session_state is a yield point:
+    it raises Streamlit's rerun/stop exception when the user has interacted
+    with the page. The `finally` block then cancels the in-flight request
+    instead of letting it run to completion for nobody.
+    """
+    in_script = get_script_run_ctx(suppress_warning=True) is not None
+    try:
+        while True:
+            try:
+                return future.result(timeout=POLL_INTERVAL if in_script else None)
+            except FutureTimeoutError:
+                _yield_to_streamlit()
+    finally:
+        if not future.done():
+            future.cancel()
+
+
+def wait_first(futures: Iterable[Future]) -> Set[Future]:
+    """
+    Block until at least one future finishes and return the finished ones.
+
+    For callers that keep adding futures while they wait; the caller cancels
+    whatever is still pending if the script is interrupted.
+    """
+    futures = set(futures)
+    in_script = get_script_run_ctx(suppress_warning=True) is not None
+    while True:
+        done, _ = wait_futures(futures, timeout=POLL_INTERVAL if in_script else None, return_when=FIRST_COMPLETED)
+        if done:
+            return done
+        _yield_to_streamlit()
+
+
+def as_completed(futures: Iterable[Future]) -> Iterator[Future]:
+    """
+    Yield futures as they finish, cancelling the rest if the script is interrupted.
+
+    Like wait(), but for a group of futures whose results are shown as soon
+    as each one is ready.
+    """
+    pending = set(futures)
+    try:
+        while pending:
+            done = wait_first(pending)
+            pending -= done
+            yield from done
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def cancel_session(session_id: Optional[str] = None) -> int:
+    """Cancel every in-flight request of a session (defaults to the current one)"""
+    session_id = session_id or _session_id()
+    with _inflight_lock:
+        futures = list(_inflight.get(session_id, ()))
+    for future in futures:
+        future.cancel()
+    return len(futures)
+
+
+def _count_usage(usage):
+    """Token counters from a response's usage block, when the provider sends one"""
+    if usage is None:
+        return
+    telemetry.count("llm_tokens_total", getattr(usage, "prompt_tokens", 0) or 0, kind="prompt")
+    telemetry.count("llm_tokens_total", getattr(usage, "completion_tokens", 0) or 0, kind="completion")
+
+
+async def acomplete(api_key: str, model: str, messages: List[dict],
+                    base_url: str = OPENROUTER_BASE_URL, **params) -> str:
+    """
+    Run one chat completion on the engine loop and return the reply text.
+
+    Transient errors are retried with backoff behind the model's circuit
+    breaker (see resilience.call_with_retry).
+    """
+    client = get_async_client(api_key, base_url)
+
+    async def attempt():
+        # The concurrency slot is only held while a request is in flight, not while backing off
+        async with _semaphore(model):
+            return await client.chat.completions.create(model=model, messages=messages, **params)
+
+    with telemetry.span("model_call", model=model):
+        response = await call_with_retry(model, attempt)
+        _count_usage(getattr(response, "usage", None))
+    return response.choices[0].message.content.strip()
+
+
+def complete(api_key: str, model: str, messages: List[dict],
+             base_url: str = OPENROUTER_BASE_URL, **params) -> str:
+    """
+    Synchronous entry point used by the feature modules.
+
+    Args:
+        api_key: OpenRouter API key
+        model: Model name
+        messages: Chat messages
+        base_url: API base URL
+        **params: Extra completion parameters (temperature, max_tokens, ...)
+
+    Returns:
+        Reply text
+    """
+    return wait(submit(acomplete(api_key, model, messages, base_url, **params)))
+
+
+async def _timed(router: ModelRouter, model: str, coro):
+    started = time.monotonic()
+    try:
+        result = await coro
+    except asyncio.CancelledError:
+        # A hedge that lost the race says nothing about the model
+        raise
+    except Exception:
+        router.observe(model, None, ok=False)
+        raise
+    router.observe(model, time.monotonic() - started, ok=True)
+    return result
+
+
+async def acomplete_routed(api_key: str, router: ModelRouter, messages: List[dict],
+                           base_url: str = OPENROUTER_BASE_URL, **params) -> Tuple[str, str]:
+    """
+    Run a chat completion on the best model of a router.
+
+    If the chosen model has not answered after the router's hedge delay, the
+    next ranked model is asked too and the first reply wins; the other
+    request is cancelled. A failed model falls through to the next one.
+
+    Returns:
+        (reply text, model that answered) - callers caching replies key
+        them on that model, so a fallback's answer is never served as the
+        primary model's
+    """
+    order = router.ranked()
+    running: Dict[asyncio.Task, str] = {}
+    last_error: Optional[BaseException] = None
+
+    def launch():
+        model = order[len(tried)]
+        tried.append(model)
+        coro = acomplete(api_key, model, messages, base_url, **params)
+        running[asyncio.ensure_future(_timed(router, model, coro))] = model
+
+    tried: List[str] = []
+    launch()
+    try:
+        while running:
+            # Hedge at most one backup request at a time
+            can_hedge = len(tried) < len(order) and len(running) == 1
+            timeout = router.hedge_delay(tried[-1]) if can_hedge else None
+            done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                launch()
+                continue
+            for task in done:
+                model = running.pop(task)
+                if task.exception() is None:
+                    return task.result(), model
+                last_error = task.exception()
+            if not running and len(tried) < len(order):
+                launch()
+        raise last_error
+    finally:
+        for task in running:
+            task.cancel()
+
+
+def complete_routed(api_key: str, router: ModelRouter, messages: List[dict],
+                    base_url: str = OPENROUTER_BASE_URL, **params) -> Tuple[str, str]:
+    """Synchronous acomplete_routed, for feature modules; returns (reply, model)"""
+    return wait(submit(acomplete_routed(api_key, router, messages, base_url, **params)))
+
+
+_STREAM_END = object()
+
+
+def stream(api_key: str, model: str, messages: List[dict],
+           base_url: str = OPENROUTER_BASE_URL, **params) -> Iterator[str]:
+    """
+    Stream a chat completion, yielding text deltas on the calling thread.
+
+    Closing the generator (e.g. on a Streamlit rerun) cancels the request.
+    Transient errors are retried as long as nothing has been yielded yet.
+    """
+    deltas: "queue.Queue" = queue.Queue()
+    streamed = False
+
+    async def attempt():
+        nonlocal streamed
+        client = get_async_client(api_key, base_url)
+        async with _semaphore(model):
+            response = await client.chat.completions.create(
+                model=model, messages=messages, stream=True, **params
+            )
+            async for chunk in response:
+                _count_usage(getattr(chunk, "usage", None))
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    streamed = True
+                    deltas.put(delta)
+
+    async def produce():
+        try:
+            with telemetry.span("model_call", model=model):
+                await call_with_retry(model, attempt, can_retry=lambda e: not streamed)
+        except BaseException as e:
+            deltas.put(e)
+            raise
+        finally:
+            deltas.put(_STREAM_END)
+
+    future = submit(produce())
+    in_script = get_script_run_ctx(suppress_warning=True) is not None
+    try:
+        while True:
+            try:
+                item = deltas.get(timeout=POLL_INTERVAL if in_script else None)
+            except queue.Empty:
+                _yield_to_streamlit()
+                continue
+            if item is _STREAM_END:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        if not future.done():
+            future.cancel()
+
+
+def stream_routed(api_key: str, router: ModelRouter, messages: List[dict],
+                  base_url: str = OPENROUTER_BASE_URL, on_model: Optional[Callable[[str], None]] = None,
+                  **params) -> Iterator[str]:
+    """
+    Stream from the best model of a router.
+
+    Streams are not hedged, but a model that fails before its first token
+    falls through to the next ranked one. `on_model` is called with the
+    model whose stream is being yielded, before its first delta.
+    """
+    order = router.ranked()
+    for index, model in enumerate(order):
+        started = time.monotonic()
+        streamed = False
+        try:
+            for delta in stream(api_key, model, messages, base_url, **params):
+                if not streamed and on_model:
+                    on_model(model)
+                streamed = True
+                yield delta
+        except Exception:
+            router.observe(model, None, ok=False)
+            if streamed or index == len(order) - 1:
+                raise
+            continue
+        router.observe(model, time.monotonic() - started, ok=True)
+        return
@@ -0,0 +1,152 @@
+import os
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Sequence
+
+from resilience import get_breaker
+
+# Recent calls kept per model for latency percentiles and error rate
+ROUTER_WINDOW = int(os.getenv("ROUTER_WINDOW", "50"))
+# Calls needed before a model's own statistics are trusted
+ROUTER_MIN_SAMPLES = int(os.getenv("ROUTER_MIN_SAMPLES", "5"))
+# Error rate above which a model is skipped while others are healthy
+ROUTER_MAX_ERROR_RATE = float(os.getenv("ROUTER_MAX_ERROR_RATE", "0.5"))
+# Seconds before a backup request is fired, until the primary has its own p95
+ROUTER_HEDGE_AFTER = float(os.getenv("ROUTER_HEDGE_AFTER", "10"))
+# Never hedge sooner than this, however fast the primary usually is
+ROUTER_HEDGE_MIN = float(os.getenv("ROUTER_HEDGE_MIN", "1"))
+
+
+def _percentile(values: Sequence[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class ModelStats:
+    """Rolling latency and error window of one model"""
+
+    def __init__(self, window: int = ROUTER_WINDOW):
+        self._latencies: deque = deque(maxlen=window)
+        self._outcomes: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, latency: Optional[float], ok: bool):
+        with self._lock:
+            self._outcomes.append(ok)
+            if ok and latency is not None:
+                self._latencies.append(latency)
+
+    @property
+    def samples(self) -> int:
+        return len(self._outcomes)
+
+    def p50(self) -> Optional[float]:
+        with self._lock:
+            return _percentile(self._latencies, 0.5) if self._latencies else None
+
+    def p95(self) -> Optional[float]:
+        with self._lock:
+            return _percentile(self._latencies, 0.95) if self._latencies else None
+
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return 1 - sum(self._outcomes) / len(self._outcomes)
+
+
+class ModelRouter:
+    """
+    Ranked candidate models for one task.
+
+    ranked() orders healthy models by observed p95 latency. A model without
+    enough samples is assumed to be as slow as the hedge threshold, so it
+    keeps its configured position until a better-known model beats it.
+    Models whose circuit is open or whose recent error rate is too high
+    are moved to the end, to be used only as a last resort.
+    """
+
+    def __init__(self, task: str, candidates: Sequence[str], hedge_after: float = ROUTER_HEDGE_AFTER):
+        if not candidates:
+            raise ValueError(f"No candidate models for task {task!r}")
+        self.task = task
+        self.candidates: List[str] = list(dict.fromkeys(candidates))
+        self.hedge_after = hedge_after
+        self._stats: Dict[str, ModelStats] = {model: ModelStats() for model in self.candidates}
+
+    @property
+    def primary(self) -> str:
+        """The first configured candidate"""
+        return self.candidates[0]
+
+    def observe(self, model: str, latency: Optional[float], ok: bool):
+        """Record the outcome of one call (latency in seconds, successes only)"""
+        stats = self._stats.get(model)
+        if stats is not None:
+            stats.observe(latency, ok)
+
+    def healthy(self, model: str) -> bool:
+        stats = self._stats[model]
+        if get_breaker(model).state == "open":
+            return False
+        return stats.samples < ROUTER_MIN_SAMPLES or stats.error_rate() <= ROUTER_MAX_ERROR_RATE
+
+    def expected_latency(self, model: str) -> float:
+        stats = self._stats[model]
+        p95 = stats.p95()
+        if p95 is None or stats.samples < ROUTER_MIN_SAMPLES:
+            return self.hedge_after
+        return p95
+
+    def ranked(self) -> List[str]:
+        """Candidates, best first"""
+        order = {model: index for index, model in enumerate(self.candidates)}
+        return sorted(
+            self.candidates,
+            key=lambda model: (not self.healthy(model), self.expected_latency(model), order[model])
+        )
+
+    def hedge_delay(self, model: str) -> float:
+        """Seconds to wait on `model` before firing a backup request"""
+        return max(ROUTER_HEDGE_MIN, self.expected_latency(model))
+
+    def stats(self) -> Dict[str, dict]:
+        return {
+            model: {
+                "p50": stats.p50(),
+                "p95": stats.p95(),
+                "error_rate": stats.error_rate(),
+                "samples": stats.samples,
+                "healthy": self.healthy(model),
+            }
+            for model, stats in self._stats.items()
+        }
+
+
+_routers: Dict[str, ModelRouter] = {}
+_routers_lock = threading.Lock()
+
+
+def get_router(task: str, default_candidates: Sequence[str]) -> ModelRouter:
+    """
+    Return the process-wide router of a task.
+
+    The candidate list can be overridden with a comma-separated
+    ROUTER_MODELS_<TASK> environment variable (e.g. ROUTER_MODELS_CHAT).
+    """
+    with _routers_lock:
+        router = _routers.get(task)
+        if router is None:
+            override = os.getenv(f"ROUTER_MODELS_{task.upper()}", "")
+            candidates = [m.strip() for m in override.split(",") if m.strip()] or default_candidates
+            router = ModelRouter(task, candidates)
+            _routers[task] = router
+        return router
+
+
+def router_stats() -> Dict[str, Dict[str, dict]]:
+    """Per-task, per-model routing statistics"""
+    with _routers_lock:
+        routers = list(_routers.values())
+    return {router.task: router.stats() for router in routers}
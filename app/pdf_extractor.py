@@ -0,0 +1,147 @@
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional
+
+import pdfplumber
+
+# Documents with at least this many pages are fanned out to the process pool
+PARALLEL_PAGE_THRESHOLD = int(os.getenv("PDF_PARALLEL_THRESHOLD", "32"))
+PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn avoids forking the threaded Streamlit server
+            _executor = ProcessPoolExecutor(
+                max_workers=PDF_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+
+def _page_text(page) -> str:
+    # extract_text() returns None for pages without a text layer (e.g. scans)
+    text = page.extract_text() or ""
+    # Drop pdfplumber's per-page object cache so memory stays bounded
+    # (flush_cache exists in every pdfplumber >= 0.10.0; close() only in 0.10.4+)
+    page.flush_cache()
+    return text
+
+
+def _open(source, pages: Optional[List[int]] = None):
+    # In-memory uploads (bytes / memoryview) are read through a BytesIO
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    return pdfplumber.open(source, pages=pages)
+
+
+def _extract_page_batch(source, page_numbers: List[int]) -> List[str]:
+    """Worker entry point - extract a batch of 1-based page numbers"""
+    with _open(source, page_numbers) as pdf:
+        return [_page_text(page) for page in pdf.pages]
+
+
+def count_pages(source) -> int:
+    with _open(source) as pdf:
+        return len(pdf.pages)
+
+
+def select_pages(total: int, pages: Optional[Iterable[int]] = None, max_pages: Optional[int] = None) -> List[int]:
+    """
+    Resolve a page selection to a list of valid 1-based page numbers.
+
+    Args:
+        total: Number of pages in the document
+        pages: Optional page numbers or range (1-based), e.g. range(1, 11)
+        max_pages: Optional cap on the number of pages returned
+
+    Returns:
+        Sorted list of page numbers
+    """
+    if pages is None:
+        selected = list(range(1, total + 1))
+    else:
+        selected = sorted({p for p in pages if 1 <= p <= total})
+    if max_pages:
+        selected = selected[:max_pages]
+    return selected
+
+
+def iter_pdf_pages(source, pages: Optional[Iterable[int]] = None,
+                   max_pages: Optional[int] = None, parallel: Optional[bool] = None) -> Iterator[str]:
+    """
+    Lazily yield the text of each selected PDF page, in page order.
+
+    Large documents are split into batches and extracted in a process pool;
+    batches are yielded in order as soon as they are ready, so callers never
+    hold more than a few batches in memory.
+
+    Args:
+        source: Path to the PDF, or its bytes / memoryview
+        pages: Optional page numbers or range (1-based)
+        max_pages: Optional cap on the number of pages extracted
+        parallel: Force (True) or disable (False) the process pool;
+            by default it is used above PDF_PARALLEL_THRESHOLD pages
+
+    Yields:
+        Page text ("" for pages without a text layer)
+    """
+    selected = select_pages(count_pages(source), pages, max_pages)
+    if parallel is None:
+        parallel = len(selected) >= PARALLEL_PAGE_THRESHOLD and PDF_WORKERS > 1
+
+    if not parallel:
+        with _open(source, selected) as pdf:
+            for page in pdf.pages:
+                yield _page_text(page)
+        return
+
+    if isinstance(source, (str, os.PathLike)):
+        yield from _iter_parallel(source, selected)
+        return
+
+    # Worker processes re-open the document by path; spill in-memory
+    # uploads to a temporary file once rather than pickling them per task
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        tmp.write(source)
+    try:
+        yield from _iter_parallel(tmp.name, selected)
+    finally:
+        os.remove(tmp.name)
+
+
+def _iter_parallel(path, selected: List[int]) -> Iterator[str]:
+    # Every task re-opens the document, so keep the number of tasks modest
+    batch_size = max(PAGES_PER_TASK, -(-len(selected) // (PDF_WORKERS * 4)))
+    batches = [selected[i:i + batch_size] for i in range(0, len(selected), batch_size)]
+    executor = _get_executor()
+    # Keep a bounded window of batches in flight
+    window = PDF_WORKERS * 2
+    futures = [executor.submit(_extract_page_batch, path, batch) for batch in batches[:window]]
+    next_batch = len(futures)
+    try:
+        while futures:
+            for text in futures.pop(0).result():
+                yield text
+            if next_batch < len(batches):
+                futures.append(executor.submit(_extract_page_batch, path, batches[next_batch]))
+                next_batch += 1
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def extract_pdf_text(source, pages: Optional[Iterable[int]] = None,
+                     max_pages: Optional[int] = None, parallel: Optional[bool] = None) -> str:
+    """Extract text from the selected pages of a PDF as a single string"""
+    return "\n".join(iter_pdf_pages(source, pages, max_pages, parallel)).strip()
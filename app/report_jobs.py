@@ -0,0 +1,211 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+import telemetry
+from cache import content_hash
+
+# Jobs run at once across all sessions
+REPORT_JOB_WORKERS = int(os.getenv("REPORT_JOB_WORKERS", "2"))
+# Finished jobs kept for polling and deduplication
+REPORT_JOB_HISTORY = int(os.getenv("REPORT_JOB_HISTORY", "64"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class Job:
+    """State of one background job; updated by its worker, read by get()"""
+
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.status = QUEUED
+        self.stage: Optional[str] = None
+        self.done = 0
+        self.total = 0
+        self.partial: Dict[int, str] = {}
+        self.result: Optional[str] = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.finished = threading.Event()
+        self._simplified = set()
+        self._followers = []
+        self._lock = threading.Lock()
+
+    def update(self, **fields):
+        with self._lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+
+    def chunk_progress(self, index: int, stage: str, text: str):
+        """Record a chunk finishing a translate_text() stage"""
+        with self._lock:
+            self._simplified.add(index)
+            if stage == "translated":
+                self.partial[index] = text
+                self.done = len(self.partial)
+            if len(self._simplified) >= self.total:
+                self.stage = "translate"
+
+    def finish(self, **fields):
+        """Set the final fields, then start jobs waiting on this one"""
+        with self._lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.finished.set()
+            followers, self._followers = self._followers, []
+        for callback in followers:
+            callback()
+
+    def then(self, callback: Callable[[], None]):
+        """Call `callback` once the job has finished (right away if it has)"""
+        with self._lock:
+            if not self.finished.is_set():
+                self._followers.append(callback)
+                return
+        callback()
+
+    def snapshot(self) -> dict:
+        """Consistent copy of the job for the UI"""
+        with self._lock:
+            # Partial text is the finished prefix, so it reads in order
+            prefix = []
+            while len(prefix) in self.partial:
+                prefix.append(self.partial[len(prefix)])
+            return {
+                "id": self.id,
+                "status": self.status,
+                "stage": self.stage,
+                "done": self.done,
+                "total": self.total,
+                # Segments merged into a neighbour's translation are empty
+                "partial": "\n\n".join(part for part in prefix if part),
+                "result": self.result,
+                "error": self.error,
+                "elapsed": time.time() - self.created,
+            }
+
+
+class JobQueue:
+    """
+    Worker pool plus the registry of background Report Reader jobs.
+
+    Jobs survive reruns and are shared between sessions: extraction is keyed
+    by the file's content hash and translation by that hash plus language.
+    """
+
+    def __init__(self, workers: int = REPORT_JOB_WORKERS, history: int = REPORT_JOB_HISTORY):
+        self.workers = max(1, workers)
+        self.history = max(1, history)
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Created on first use; its threads have no Streamlit script context,
+        # so model calls in a job are not cancelled by reruns
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="report-job")
+            return self._executor
+
+    def _register(self, job_id: str) -> Optional[Job]:
+        """Add a new job, or return None if a live or finished one exists"""
+        with self._lock:
+            existing = self._jobs.get(job_id)
+            if existing is not None and existing.status != FAILED:
+                self._jobs.move_to_end(job_id)
+                return None
+            job = self._jobs[job_id] = Job(job_id)
+            self._jobs.move_to_end(job_id)
+            finished = [key for key, old in self._jobs.items() if old.finished.is_set()]
+            for key in finished[:max(0, len(self._jobs) - self.history)]:
+                del self._jobs[key]
+            return job
+
+    def _run(self, job: Job, work: Callable[[Job], str]):
+        job.update(status=RUNNING)
+        try:
+            result = work(job)
+        except Exception as e:
+            job.finish(error=str(e), status=FAILED)
+        else:
+            job.finish(result=result, status=DONE)
+
+    def _start(self, job: Job, work: Callable[[Job], str]):
+        # Jobs keep the submitting tab's labels for metrics
+        self._get_executor().submit(telemetry.propagating(self._run), job, work)
+
+    def submit_report(self, source, api_key: Optional[str] = None) -> str:
+        """
+        Queue text extraction of an uploaded report and return its job ID.
+
+        Args:
+            source: Image or PDF as bytes or a memoryview
+                (e.g. uploaded_file.getbuffer()); copied only for new jobs
+            api_key: Vision API key, resolved by the caller since st.secrets
+                is only read on the script thread
+        """
+        job_id = content_hash(source)
+        job = self._register(job_id)
+        if job is not None:
+            data = bytes(source)
+
+            def extract(job: Job) -> str:
+                from report_translator import extract_text
+                job.update(stage="extract")
+                text = extract_text(data, api_key=api_key)
+                # extract_text reports failures as "Error..." text; failing
+                # the job lets the same file be submitted again
+                if text.startswith("Error"):
+                    raise RuntimeError(text)
+                return text
+
+            self._start(job, extract)
+        return job_id
+
+    def submit_translation(self, report_id: str, dest_lang: str, dest_lang_name: str,
+                           api_key: Optional[str] = None) -> str:
+        """
+        Queue simplification and translation of an extracted report.
+
+        The job starts once the report's extraction job has finished.
+        Chunks are published to `partial` as they are translated. `api_key`
+        is the simplification key, resolved on the script thread.
+        """
+        job_id = f"{report_id}:{dest_lang}"
+        job = self._register(job_id)
+        if job is None:
+            return job_id
+        with self._lock:
+            report = self._jobs.get(report_id)
+        if report is None:
+            job.finish(status=FAILED, error="Report is no longer available; please upload it again")
+            return job_id
+
+        def translate(job: Job) -> str:
+            from report_translator import translate_text, translation_segments
+
+            if report.status == FAILED:
+                raise RuntimeError(report.error)
+            text = report.result or ""
+            job.update(stage="simplify", total=len(translation_segments(text)))
+
+            return translate_text(text, dest_lang=dest_lang, dest_lang_name=dest_lang_name,
+                                  on_progress=job.chunk_progress, api_key=api_key)
+
+        # Chained onto the extraction instead of blocking a worker on it
+        report.then(lambda: self._start(job, translate))
+        return job_id
+
+    def get(self, job_id: Optional[str]) -> Optional[dict]:
+        """Snapshot of a job, or None if it is unknown or was evicted"""
+        with self._lock:
+            job = self._jobs.get(job_id) if job_id else None
+        return job.snapshot() if job is not None else None
+
+
+# Shared by every session of this process
+report_jobs = JobQueue()
@@ -1,68 +1,112 @@
-from PIL import Image
-import openai
-import base64
-from deep_translator import GoogleTranslator
 import os
 import streamlit as st
-from dotenv import load_dotenv
-import pdfplumber
-import io
+import config
+import llm_engine
+from resilience import CircuitOpenError
+from model_router import get_router
+from cache import TieredCache, content_hash
+from utils import chunk_text, is_pdf, read_source, split_paragraphs
+import translation_memory
+import telemetry
+from concurrent.futures import ThreadPoolExecutor
 
-load_dotenv()
+config.load()
 
-def get_openai_client():
-    """Get OpenAI client with proper API key handling"""
+def get_api_key():
+    """Get OpenRouter API key for report simplification"""
     try:
-        api_key = st.secrets["OPENROUTER_Report_API_KEY"]
+        return st.secrets["OPENROUTER_Report_API_KEY"]
     except KeyError:
-        api_key = os.getenv("OPENROUTER_Report_API_KEY")
+        return os.getenv("OPENROUTER_Report_API_KEY")
 
-    return openai.OpenAI(
-        api_key=api_key,
-        base_url="https://openrouter.ai/api/v1"
-    )
-
-def get_vision_client():
-    """Get OpenAI client for vision models with separate API key"""
+def get_vision_api_key():
+    """Get OpenRouter API key for vision models (separate key)"""
     try:
-        api_key = st.secrets["OPENROUTER_API_KEY_VISION"]
+        return st.secrets["OPENROUTER_API_KEY_VISION"]
     except KeyError:
-        api_key = os.getenv("OPENROUTER_API_KEY_VISION")
-
-    return openai.OpenAI(
-        api_key=api_key,
-        base_url="https://openrouter.ai/api/v1"
-    )
+        return os.getenv("OPENROUTER_API_KEY_VISION")
 
 # Use OpenRouter supported models - GPT-4o for vision, Gemini for translation
 MODEL_NAME = "google/gemini-2.0-flash-exp:free"
 VISION_MODEL = "openai/gpt-4o"
+# Fallback / hedge candidates, best first (override with ROUTER_MODELS_SIMPLIFY / ROUTER_MODELS_REPORT_OCR)
+SIMPLIFY_ROUTER = get_router("simplify", [MODEL_NAME, "meta-llama/llama-3.1-8b-instruct", "openai/gpt-4o-mini"])
+OCR_ROUTER = get_router("report_ocr", [VISION_MODEL, "openai/gpt-4o-mini"])
+
+# 🗄️ Extraction results keyed by file content hash - survives Streamlit reruns
+# and is shared between sessions. Set REPORT_CACHE_DIR to also persist to disk.
+_extraction_cache = TieredCache(
+    maxsize=int(os.getenv("REPORT_CACHE_SIZE", "64")),
+    directory=os.getenv("REPORT_CACHE_DIR") or None,
+    name="report_extraction"
+)
+
+# Default cap on PDF pages extracted per report (0 = no limit)
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "0"))
 
 # 🔍 Function to extract text from an image or PDF using LLM vision or pdfplumber
-def extract_text(file_path):
-    file_extension = os.path.splitext(file_path)[1].lower()
+def extract_text(source, pages=None, max_pages=None, api_key=None):
+    """
+    Extract text from a report, OCR-ing each unique file only once.
+
+    Args:
+        source: Image or PDF as a file path, bytes, memoryview
+            (e.g. uploaded_file.getbuffer()) or file-like object
+        pages: Optional 1-based page numbers/range to read from a PDF
+        max_pages: Optional cap on PDF pages (defaults to PDF_MAX_PAGES)
+        api_key: Vision API key (defaults to get_vision_api_key(); pass it
+            when calling from a thread other than the script thread)
+    """
+    try:
+        data = read_source(source)
+    except OSError as e:
+        return f"Error: Could not read file: {str(e)}"
+    digest = content_hash(data)
+    pdf = is_pdf(data)
+
+    if max_pages is None:
+        max_pages = PDF_MAX_PAGES or None
+    if pdf:
+        page_spec = ",".join(map(str, pages)) if pages is not None else "all"
+        cache_key = f"{digest}:pdfplumber:{page_spec}:{max_pages or 0}"
+    else:
+        # OCR results are keyed by the model that read them; only the
+        # primary model's are served from the cache
+        cache_key = f"{digest}:{OCR_ROUTER.primary}"
+    cached = _extraction_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    with telemetry.span("extract"):
+        text, model = _extract_text_uncached(data, pdf, pages, max_pages, api_key)
+    # Don't cache failures so the next rerun can try again
+    if not text.startswith("Error"):
+        _extraction_cache.set(cache_key if pdf else f"{digest}:{model}", text)
+    return text
 
-    if file_extension == '.pdf':
-        # Extract text from PDF
+def _extract_text_uncached(data, pdf, pages=None, max_pages=None, api_key=None):
+    """Returns (text, OCR model that read it - None for PDFs and errors)"""
+    # pdfplumber, PIL and openai are only loaded once a report is uploaded
+    import openai
+    from image_preprocessing import preprocess_image, to_data_url
+    from pdf_extractor import extract_pdf_text
+
+    if pdf:
+        # Extract text from PDF page by page (large files use a process pool)
         try:
-            with pdfplumber.open(file_path) as pdf:
-                text = ""
-                for page in pdf.pages:
-                    text += page.extract_text() + "\n"
-            return text.strip()
+            text = extract_pdf_text(data, pages=pages, max_pages=max_pages)
         except Exception as e:
-            return f"Error extracting text from PDF: {str(e)}"
+            return f"Error extracting text from PDF: {str(e)}", None
+        if not text:
+            # Scanned PDFs have no text layer; an error keeps "" out of the cache
+            return "Error: This PDF has no text layer (it may be a scanned document). Please upload the pages as images so they can be read with OCR.", None
+        return text, None
     else:
         # Assume it's an image
         try:
-            # Encode image to base64 in memory
-            image = Image.open(file_path)
-            # Convert to RGB if image has alpha channel (RGBA)
-            if image.mode == 'RGBA':
-                image = image.convert('RGB')
-            buffer = io.BytesIO()
-            image.save(buffer, format="JPEG")
-            base64_image = base64.b64encode(buffer.getvalue()).decode('utf-8')
+            # Downscale, strip metadata and encode with the real MIME type
+            image_bytes, mime = preprocess_image(data)
+            image_url = to_data_url(image_bytes, mime)
 
             prompt = "Extract all the text from this medical report image. Provide only the extracted text without any additional comments or formatting."
 
@@ -71,73 +115,213 @@ def extract_text(file_path):
                     "role": "user",
                     "content": [
                         {"type": "text", "text": prompt},
-                        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}}
+                        {"type": "image_url", "image_url": {"url": image_url}}
                     ]
                 }
             ]
 
-            client = get_vision_client()
-
-            # Add retry logic for rate limits
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    response = client.chat.completions.create(
-                        model=VISION_MODEL,
-                        messages=messages,
-                        temperature=0.1,
-                        max_tokens=1024
-                    )
-                    extracted_text = response.choices[0].message.content.strip()
-                    return extracted_text
-                except Exception as api_error:
-                    error_str = str(api_error).lower()
-                    if "429" in error_str or "rate" in error_str:
-                        if attempt < max_retries - 1:
-                            import time
-                            time.sleep(2 ** attempt)  # Exponential backoff
-                            continue
-                        else:
-                            return f"Error: Rate limit exceeded for free model. Please try again in a few minutes, or consider upgrading to a paid plan for higher limits."
-                    else:
-                        # Re-raise non-rate-limit errors
-                        raise api_error
+            # Transient errors are retried with backoff inside llm_engine
+            try:
+                return llm_engine.complete_routed(
+                    api_key or get_vision_api_key(),
+                    OCR_ROUTER,
+                    messages,
+                    temperature=0.1,
+                    max_tokens=1024
+                )
+            except openai.RateLimitError:
+                return f"Error: Rate limit exceeded for free model. Please try again in a few minutes, or consider upgrading to a paid plan for higher limits.", None
+            except CircuitOpenError as e:
+                return f"Error: The vision model is failing right now ({str(e)}). Please try again shortly.", None
         except Exception as e:
             # No fallback available - Tesseract removed for deployment compatibility
-            return f"Error: Could not extract text from image. LLM vision failed: {str(e)}. Please try a different image or ensure the image contains clear text."
+            return f"Error: Could not extract text from image. LLM vision failed: {str(e)}. Please try a different image or ensure the image contains clear text.", None
 
-# 🌐 Function to simplify and translate text to a specified language using LLM for simplification and GoogleTranslator for translation
-def translate_text(text, dest_lang="hi", dest_lang_name="Hindi"):
-    try:
-        # First, simplify the medical report in simple words using LLM
-        simplify_prompt = f"Simplify the following medical report text into simple, easy-to-understand words. Explain any medical terms in plain language. Provide only the simplified text:\n\n{text}"
-        simplify_messages = [{"role": "user", "content": simplify_prompt}]
-        client = get_openai_client()
-        simplify_response = client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=simplify_messages,
+# Chunking / concurrency for long reports
+TRANSLATE_CHUNK_CHARS = int(os.getenv("TRANSLATE_CHUNK_CHARS", "1500"))
+TRANSLATE_WORKERS = int(os.getenv("TRANSLATE_WORKERS", "4"))
+# GoogleTranslator rejects inputs longer than 5000 characters
+GOOGLE_TRANSLATE_MAX_CHARS = 4500
+
+def _google_translate(text, source, dest_lang):
+    """Translate with GoogleTranslator, splitting inputs that exceed its size limit"""
+    from deep_translator import GoogleTranslator
+    translator = GoogleTranslator(source=source, target=dest_lang)
+    with telemetry.span("translate"):
+        if len(text) <= GOOGLE_TRANSLATE_MAX_CHARS:
+            return translator.translate(text)
+        parts = chunk_text(text, GOOGLE_TRANSLATE_MAX_CHARS)
+        return "\n\n".join(translator.translate(part) or "" for part in parts)
+
+def translation_segments(text):
+    """
+    Units the translation memory is keyed on: paragraphs, with paragraphs
+    longer than TRANSLATE_CHUNK_CHARS split on sentence boundaries.
+    """
+    segments = []
+    for paragraph in split_paragraphs(text):
+        if len(paragraph) <= TRANSLATE_CHUNK_CHARS:
+            segments.append(paragraph)
+        else:
+            segments.extend(chunk_text(paragraph, TRANSLATE_CHUNK_CHARS))
+    return segments
+
+def _batch_segments(segments, indices):
+    """Pack the given segments, in order, into batches of at most TRANSLATE_CHUNK_CHARS"""
+    batches, current, size = [], [], 0
+    for index in indices:
+        length = len(segments[index])
+        if current and size + 2 + length > TRANSLATE_CHUNK_CHARS:
+            batches.append(current)
+            current, size = [], 0
+        size += length + (2 if current else 0)
+        current.append(index)
+    if current:
+        batches.append(current)
+    return batches
+
+def _simplify_messages(text):
+    # Simplify the medical report in simple words using LLM
+    simplify_prompt = f"Simplify the following medical report text into simple, easy-to-understand words. Explain any medical terms in plain language. Keep one paragraph for each paragraph of the input, separated by blank lines. Provide only the simplified text:\n\n{text}"
+    return [{"role": "user", "content": simplify_prompt}]
+
+async def _asimplify(api_key, text):
+    with telemetry.span("simplify"):
+        simplified, _ = await llm_engine.acomplete_routed(
+            api_key,
+            SIMPLIFY_ROUTER,
+            _simplify_messages(text),
             temperature=0.5,
             max_tokens=1024
         )
-        simplified = simplify_response.choices[0].message.content.strip()
+    return simplified
 
-        # Then, translate to the target language using GoogleTranslator for reliability
-        if dest_lang != "en":
-            translator = GoogleTranslator(source='en', target=dest_lang)
-            final_text = translator.translate(simplified)
-        else:
-            final_text = simplified
+def _split_batch(segments, translated):
+    """
+    Map a batch's translation back onto its segments. Returns (one text per
+    segment, whether the mapping is exact); when the paragraph count changed,
+    the whole translation goes to the first segment.
+    """
+    if len(segments) == 1:
+        return [translated], True
+    parts = split_paragraphs(translated)
+    if len(parts) == len(segments):
+        return parts, True
+    return [translated] + [""] * (len(segments) - 1), False
 
-        return final_text
-    except Exception as e:
-        # Fallback: directly translate the original text using GoogleTranslator
+def _finish_batch(segments, dest_lang, simplified):
+    """Translate a simplified batch, or the original if simplifying failed"""
+    if simplified is not None:
         try:
+            # Translate to the target language using GoogleTranslator for reliability
             if dest_lang != "en":
-                translator = GoogleTranslator(source='auto', target=dest_lang)
-                final_text = translator.translate(text)
+                final_text = _google_translate(simplified, 'en', dest_lang)
             else:
-                final_text = text
-            return final_text
-        except Exception as fallback_e:
-            # Last resort: return original text
-            return text
+                final_text = simplified
+
+            parts, exact = _split_batch(segments, final_text)
+            # Only successful simplify + translate results go into the memory,
+            # and only when each segment's share of the output is known
+            if exact:
+                for segment, part in zip(segments, parts):
+                    translation_memory.remember(segment, dest_lang, part)
+            return parts
+        except Exception:
+            pass
+    # Fallback: directly translate the original text using GoogleTranslator
+    text = "\n\n".join(segments)
+    try:
+        if dest_lang != "en":
+            return _split_batch(segments, _google_translate(text, 'auto', dest_lang))[0]
+        return list(segments)
+    except Exception:
+        # Last resort: return original text
+        return list(segments)
+
+# 🌐 Function to simplify and translate text to a specified language using LLM for simplification and GoogleTranslator for translation
+def translate_text(text, dest_lang="hi", dest_lang_name="Hindi", max_workers=None, on_progress=None,
+                   api_key=None):
+    """
+    Simplify and translate text, segment by segment.
+
+    The text is split into paragraphs (see translation_segments), which are
+    looked up in the translation memory one by one, so boilerplate shared
+    between different reports is only translated once. The misses are packed
+    into batches of at most TRANSLATE_CHUNK_CHARS characters. Up to
+    max_workers batches are simplified at once; the model calls are submitted
+    from the calling thread, so a Streamlit rerun cancels them, and only the
+    GoogleTranslator calls run on a worker pool. Segments are reassembled in
+    their original order.
+
+    Args:
+        text: Source text
+        dest_lang: Target language code
+        dest_lang_name: Target language display name
+        max_workers: Concurrent batches (defaults to TRANSLATE_WORKERS)
+        on_progress: Optional callback(index, stage, text), called per segment
+            with stage "simplified" and then "translated" as its batch
+            finishes that step
+        api_key: Simplification API key (defaults to get_api_key(); pass it
+            when calling from a thread other than the script thread)
+
+    Returns:
+        Simplified, translated text
+    """
+    if not text or not text.strip():
+        return text
+
+    segments = translation_segments(text)
+    # Reuse earlier translations of the same paragraphs
+    results = [translation_memory.lookup(segment, dest_lang) for segment in segments]
+    if on_progress:
+        for index, result in enumerate(results):
+            if result is not None:
+                on_progress(index, "translated", result)
+    queued = _batch_segments(segments, [index for index, result in enumerate(results) if result is None])
+    if not queued:
+        return "\n\n".join(results)
+
+    api_key = api_key or get_api_key()
+    workers = max(1, min(max_workers or TRANSLATE_WORKERS, len(queued)))
+    executor = ThreadPoolExecutor(max_workers=workers)
+    # future -> (stage, segment indices of the batch)
+    in_flight = {}
+
+    def simplify_next():
+        simplifying = sum(1 for stage, _ in in_flight.values() if stage == "simplify")
+        for _ in range(min(workers - simplifying, len(queued))):
+            batch = queued.pop(0)
+            source = "\n\n".join(segments[index] for index in batch)
+            in_flight[llm_engine.submit(_asimplify(api_key, source))] = ("simplify", batch)
+
+    try:
+        simplify_next()
+        while in_flight:
+            for future in llm_engine.wait_first(in_flight):
+                stage, batch = in_flight.pop(future)
+                if stage == "simplify":
+                    batch_segments = [segments[index] for index in batch]
+                    try:
+                        simplified = future.result()
+                    except Exception:
+                        simplified = None
+                    else:
+                        if on_progress:
+                            parts = _split_batch(batch_segments, simplified)[0]
+                            for index, part in zip(batch, parts):
+                                on_progress(index, "simplified", part)
+                    translate = telemetry.propagating(_finish_batch)
+                    in_flight[executor.submit(translate, batch_segments, dest_lang, simplified)] = ("translate", batch)
+                else:
+                    for index, part in zip(batch, future.result()):
+                        results[index] = part
+                        if on_progress:
+                            on_progress(index, "translated", part)
+            simplify_next()
+        # Segments whose batch came back with fewer paragraphs are left empty
+        return "\n\n".join(result for result in results if result)
+    finally:
+        # A rerun while waiting cancels the model calls still in flight
+        for future in in_flight:
+            future.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,199 @@
+import asyncio
+import email.utils
+import os
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+import telemetry
+
+# Attempts per model call, including the first one
+RETRY_ATTEMPTS = int(os.getenv("LLM_RETRY_ATTEMPTS", "3"))
+BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+# Longest single wait; a longer Retry-After fails the call instead of parking it
+BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "20"))
+# Consecutive transient failures that open a model's circuit, and how long it stays open
+BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+# Status codes worth retrying: timeouts, conflicts, rate limits and server errors
+_RETRYABLE_STATUS = {408, 409, 429}
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the provider while a model's circuit is open"""
+
+    def __init__(self, model: str, retry_in: float):
+        super().__init__(f"{model} is temporarily unavailable, retry in {retry_in:.0f}s")
+        self.model = model
+        self.retry_in = retry_in
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether an OpenAI SDK error is worth retrying"""
+    import openai
+    if isinstance(error, openai.APIConnectionError):
+        # Includes APITimeoutError
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in _RETRYABLE_STATUS or error.status_code >= 500
+    return False
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the provider asked us to wait, from Retry-After(-ms) headers"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            # HTTP date form
+            return max(email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, error: Optional[BaseException] = None) -> float:
+    """
+    Delay before retry number `attempt` (0-based).
+
+    Full jitter exponential backoff, never shorter than the provider's
+    Retry-After.
+    """
+    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+    requested = retry_after(error) if error is not None else None
+    if requested is not None:
+        delay = max(delay, requested)
+    return delay
+
+
+class CircuitBreaker:
+    """
+    Per-model circuit breaker.
+
+    After `failures` consecutive transient errors the circuit opens and calls
+    fail fast for `cooldown` seconds. Then a single trial call is let through
+    (half-open); its success closes the circuit, its failure reopens it.
+    """
+
+    def __init__(self, model: str, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN):
+        self.model = model
+        self.failures = failures
+        self.cooldown = cooldown
+        self._consecutive = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at < self.cooldown:
+                return "open"
+            return "half-open"
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go out now"""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self.cooldown - (time.monotonic() - self._opened_at)
+            if remaining > 0 or self._trial_running:
+                raise CircuitOpenError(self.model, max(remaining, 0.0))
+            self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            self._consecutive = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive += 1
+            if self._trial_running or self._consecutive >= self.failures:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+    def release(self):
+        """End a trial call that neither succeeded nor failed transiently"""
+        with self._lock:
+            self._trial_running = False
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(model: str) -> CircuitBreaker:
+    """Return the process-wide circuit breaker of a model"""
+    with _breakers_lock:
+        breaker = _breakers.get(model)
+        if breaker is None:
+            breaker = CircuitBreaker(model)
+            _breakers[model] = breaker
+        return breaker
+
+
+def breaker_states() -> Dict[str, str]:
+    """Current circuit state per model"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.model: breaker.state for breaker in breakers}
+
+
+async def call_with_retry(model: str, attempt: Callable[[], Awaitable],
+                          attempts: int = None,
+                          can_retry: Callable[[BaseException], bool] = None):
+    """
+    Run `attempt()` with retries, backoff and the model's circuit breaker.
+
+    Transient errors are retried after a jittered, Retry-After aware delay.
+    Waits happen on the event loop, so no worker thread sleeps. Other errors
+    (bad request, authentication, ...) are raised at once.
+
+    Args:
+        model: Model name, selects the circuit breaker
+        attempt: Zero-argument callable returning a fresh awaitable per try
+        attempts: Maximum tries (defaults to RETRY_ATTEMPTS)
+        can_retry: Optional extra check, e.g. nothing was streamed yet
+
+    Returns:
+        Result of the first successful attempt
+    """
+    attempts = max(1, attempts or RETRY_ATTEMPTS)
+    breaker = get_breaker(model)
+    for number in range(attempts):
+        breaker.before_call()
+        try:
+            result = await attempt()
+        except Exception as e:
+            if not is_transient(e):
+                breaker.release()
+                raise
+            breaker.record_failure()
+            if number + 1 >= attempts or (can_retry is not None and not can_retry(e)):
+                raise
+            delay = backoff_delay(number, e)
+            if delay > BACKOFF_MAX:
+                raise
+            telemetry.count("llm_retries_total", model=model)
+            await asyncio.sleep(delay)
+        except BaseException:
+            # Cancelled mid-call: don't leave a half-open trial hanging
+            breaker.release()
+            raise
+        else:
+            breaker.record_success()
+            return result
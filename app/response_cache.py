@@ -0,0 +1,156 @@
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from cache import LRUCache
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", str(24 * 3600)))
+# Near-duplicate matching needs the optional sentence-transformers package
+EMBEDDINGS_ENABLED = os.getenv("RESPONSE_CACHE_EMBEDDINGS", "0") == "1"
+EMBEDDING_MODEL = os.getenv("RESPONSE_CACHE_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+SIMILARITY_THRESHOLD = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.92"))
+
+_NON_WORD = re.compile(r'[^\w\s]')
+
+# Filler words that don't change what is being asked
+_STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "of", "for", "to", "in", "on",
+    "what", "whats", "which", "tell", "me", "about", "please", "can", "could", "you",
+    "i", "my", "do", "does", "give", "explain", "list", "some", "common", "main", "usual",
+    "hi", "hello", "hey", "kindly",
+}
+
+
+def normalize_question(text: str) -> str:
+    """
+    Reduce a question to a canonical key.
+
+    "What are the symptoms of dengue?" and "symptoms of dengue" both become
+    "symptom dengue": lowercase, no punctuation or filler words, naive
+    plural stripping. Word order is kept - "is dengue worse than malaria"
+    and "is malaria worse than dengue" ask opposite things - so reordered
+    paraphrases are left to the optional embedding match.
+    """
+    words = []
+    for word in _NON_WORD.sub(" ", text.lower()).split():
+        if word in _STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return " ".join(words)
+
+
+class _EmbeddingIndex:
+    """Brute-force cosine index over cached question embeddings"""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        import numpy as np
+        self._np = np
+        self._model = SentenceTransformer(model_name)
+        self._keys: List[str] = []
+        self._vectors = None
+        self._lock = threading.Lock()
+
+    def embed(self, text: str):
+        return self._model.encode([text], normalize_embeddings=True)[0]
+
+    def add(self, key: str, vector):
+        with self._lock:
+            self._keys.append(key)
+            row = vector[None, :]
+            self._vectors = row if self._vectors is None else self._np.vstack([self._vectors, row])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._keys)
+
+    def nearest(self, vector, prefix: str = "") -> Tuple[Optional[str], float]:
+        """Most similar key starting with `prefix` (e.g. one model's entries)"""
+        with self._lock:
+            if self._vectors is None:
+                return None, 0.0
+            candidates = [i for i, key in enumerate(self._keys) if key.startswith(prefix)]
+            if not candidates:
+                return None, 0.0
+            scores = self._vectors[candidates] @ vector
+            best = int(scores.argmax())
+            return self._keys[candidates[best]], float(scores[best])
+
+    def prune(self, live_keys):
+        """Drop vectors whose answers were evicted or expired"""
+        with self._lock:
+            keep = [i for i, key in enumerate(self._keys) if key in live_keys]
+            self._keys = [self._keys[i] for i in keep]
+            self._vectors = self._vectors[keep] if keep else None
+
+
+class ResponseCache:
+    """
+    Cache of answers to context-free questions.
+
+    Exact matches use the normalized question. When enabled, near-duplicates
+    are matched by embedding cosine similarity above a threshold. Entries are
+    bounded by size and expire after a TTL.
+    """
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL,
+                 embeddings: bool = EMBEDDINGS_ENABLED):
+        self._answers = LRUCache(maxsize, ttl=ttl)
+        self._index = None
+        if embeddings:
+            try:
+                self._index = _EmbeddingIndex(EMBEDDING_MODEL)
+            except ImportError:
+                self._index = None
+        self.semantic_hits = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(question: str, model: str) -> str:
+        return f"{model}\x1f{normalize_question(question)}"
+
+    def get(self, question: str, model: str) -> Optional[str]:
+        key = self._key(question, model)
+        answer = self._answers.get(key)
+        if answer is not None or self._index is None:
+            return answer
+
+        # Only the same model's answers: a fallback model's reply must not
+        # be served for a lookup keyed on the primary
+        match, score = self._index.nearest(self._index.embed(f"{model}: {question}"), prefix=f"{model}\x1f")
+        if match is not None and score >= SIMILARITY_THRESHOLD:
+            answer = self._answers.get(match)
+            if answer is not None:
+                with self._lock:
+                    self.semantic_hits += 1
+        return answer
+
+    def set(self, question: str, model: str, answer: str):
+        key = self._key(question, model)
+        is_new = key not in self._answers
+        self._answers.set(key, answer)
+        if self._index is not None and is_new:
+            self._index.add(key, self._index.embed(f"{model}: {question}"))
+            if len(self._index) > self._answers.maxsize * 2:
+                self._index.prune(self._answers)
+
+    def stats(self) -> Dict[str, float]:
+        stats = self._answers.stats()
+        stats["semantic_hits"] = self.semantic_hits
+        stats["embeddings"] = self._index is not None
+        return stats
+
+
+def cacheable_question(messages: List[dict]) -> Optional[str]:
+    """The question text if this is a first, context-free turn, else None"""
+    turns = [m for m in messages if m["role"] != "system"]
+    if len(turns) == 1 and turns[0]["role"] == "user":
+        return turns[0]["content"]
+    return None
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,253 @@
+import bisect
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "medbot"
+# Upper bounds (seconds) of the stage latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Labels every stage metric carries, so series stay comparable
+BASE_LABELS = ("tab", "model")
+
+# Labels inherited by nested spans and counters (tab, model, ...)
+_labels: contextvars.ContextVar = contextvars.ContextVar("telemetry_labels", default={})
+# Span records of the current Streamlit script run, for the debug panel
+_trace: contextvars.ContextVar = contextvars.ContextVar("telemetry_trace", default=None)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative latency histogram with fixed buckets"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Registry:
+    """Thread-safe store of counters and histograms keyed by name and labels"""
+
+    def __init__(self):
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, text: str):
+        self._help[name] = text
+
+    def inc(self, name: str, amount: float, labels: Dict[str, str]):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, labels: Dict[str, str]):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                full = f"{METRIC_PREFIX}_{name}"
+                lines.append(f"# HELP {full} {self._help.get(name, name)}")
+                lines.append(f"# TYPE {full} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{full}{_format_labels(key)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                full = f"{METRIC_PREFIX}_{name}"
+                lines.append(f"# HELP {full} {self._help.get(name, name)}")
+                lines.append(f"# TYPE {full} histogram")
+                for key, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        lines.append(f"{full}_bucket{_format_labels(key + (('le', le),))} {cumulative}")
+                    lines.append(f"{full}_sum{_format_labels(key)} {histogram.total:g}")
+                    lines.append(f"{full}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Dict[LabelKey, float]]:
+        """Counter values, for benchmarks and tests"""
+        with self._lock:
+            return {name: dict(series) for name, series in self._counters.items()}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in key) + "}"
+
+
+registry = Registry()
+registry.describe("stage_duration_seconds", "Duration of each pipeline stage")
+registry.describe("stage_errors_total", "Pipeline stages that raised an error")
+registry.describe("llm_tokens_total", "Prompt and completion tokens reported by the provider")
+registry.describe("llm_request_bytes_total", "Bytes uploaded in model requests")
+registry.describe("llm_connections_total", "Model requests on new vs reused keep-alive connections, and TLS handshakes")
+registry.describe("cache_lookups_total", "Tiered cache lookups by cache and result (memory_hit, disk_hit, miss)")
+registry.describe("llm_retries_total", "Model call retries after transient errors")
+registry.describe("image_bytes_total", "Image bytes before and after preprocessing")
+
+
+def _with_context(labels: Dict[str, str]) -> Dict[str, str]:
+    merged = {name: "" for name in BASE_LABELS}
+    merged.update(_labels.get())
+    merged.update({name: str(value) for name, value in labels.items() if value is not None})
+    return merged
+
+
+def set_tab(tab: str):
+    """Label everything recorded from here on in this script run with a tab"""
+    _labels.set({**_labels.get(), "tab": tab})
+
+
+def count(name: str, amount: float = 1, **values):
+    """Increment a counter, labelled with the current tab / model"""
+    if amount:
+        registry.inc(name, amount, _with_context(values))
+
+
+def observe_stage(stage: str, seconds: float, error: Optional[BaseException] = None, **values):
+    """
+    Record a stage duration measured elsewhere (e.g. in an HTTP trace hook).
+
+    The duration goes to the stage latency histogram and, during a
+    Streamlit script run, to the run's trace for the debug panel.
+    """
+    metric_labels = _with_context({**values, "stage": stage})
+    registry.observe("stage_duration_seconds", seconds, metric_labels)
+    # Streamlit rerun/stop exceptions are not Exception subclasses
+    failed = isinstance(error, Exception)
+    if failed:
+        registry.inc("stage_errors_total", 1, metric_labels)
+    trace = _trace.get()
+    if trace is not None:
+        trace.append({
+            "stage": stage,
+            "tab": metric_labels["tab"],
+            "model": metric_labels["model"],
+            "ms": round(seconds * 1000, 1),
+            "error": type(error).__name__ if failed else "",
+        })
+
+
+@contextmanager
+def span(stage: str, **values):
+    """
+    Time one pipeline stage with observe_stage().
+
+    Labels given here also apply to spans and counters nested inside.
+    """
+    started = time.monotonic()
+    token = _labels.set({**_labels.get(), **{k: str(v) for k, v in values.items() if v is not None}})
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _labels.reset(token)
+        observe_stage(stage, time.monotonic() - started, error, **values)
+
+
+def start_trace() -> List[dict]:
+    """Start collecting spans for the current script run and return the list"""
+    trace: List[dict] = []
+    _trace.set(trace)
+    _labels.set({})
+    return trace
+
+
+def propagating(fn):
+    """
+    Wrap `fn` to run with the caller's labels and trace in another thread.
+
+    ThreadPoolExecutor does not copy context variables; each submit needs
+    its own copy since a Context can't be entered by two threads at once.
+    """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+
+
+def bind(coro):
+    """Run a coroutine on another loop with the caller's labels and trace"""
+    labels, trace = _labels.get(), _trace.get()
+
+    async def run():
+        _labels.set(labels)
+        _trace.set(trace)
+        return await coro
+
+    return run()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes would flood the Streamlit log
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> bool:
+    """
+    Serve /metrics on a background thread, once per process.
+
+    Returns:
+        True if the endpoint is running
+    """
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return True
+        try:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            logger.warning("Metrics endpoint not started on port %s: %s", port, e)
+            return False
+        _server.daemon_threads = True
+        thread = threading.Thread(target=_server.serve_forever, name="metrics", daemon=True)
+        thread.start()
+        logger.info("Serving metrics on http://%s:%s/metrics", host, port)
+        return True
@@ -0,0 +1,211 @@
+import base64
+import os
+from functools import lru_cache
+
+import streamlit as st
+
+# Theme CSS is built once per theme and memoized for the life of the process;
+# reruns only resend the (small) stylesheet, never the background image.
+
+
+@lru_cache(maxsize=None)
+def load_bg_image(file_name):
+    """Return a CSS url() value for a background image in app/static"""
+    # Served by Streamlit's static file serving (see .streamlit/config.toml)
+    if st.get_option("server.enableStaticServing"):
+        return f"app/static/{file_name}"
+    # Fallback when static serving is disabled - inline once, then memoized
+    try:
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        full_path = os.path.join(current_dir, "static", file_name)
+        with open(full_path, "rb") as img_file:
+            encoded = base64.b64encode(img_file.read()).decode()
+        return f"data:image/png;base64,{encoded}"
+    except FileNotFoundError:
+        # Empty url will use default Streamlit background
+        return ""
+
+
+@lru_cache(maxsize=None)
+def build_theme_css(theme):
+    """Build the theme stylesheet once per theme"""
+    if theme == "Light":
+        bg_image = load_bg_image("light_bg.png")
+        text_color = "#000000"
+        chat_user_bg = "#DCF8C6"
+        chat_bot_bg = "#F1F0F0"
+        button_color = "#4CAF50"
+        button_text_color = "#ffffff"
+        tab_bg_color = "transparent"
+        tab_text_color = "red"
+    else:
+        bg_image = load_bg_image("dark_bg.png")
+        text_color = "white"
+        chat_user_bg = "#e7e7e7"
+        chat_bot_bg = "#3a3a3a"
+        button_color = "#1E88E5"
+        button_text_color = "#ffffff"
+        tab_bg_color = "transparent"
+        tab_text_color = "red"
+
+    css = f"""
+    <style>
+    .stApp {{
+        background-image: url("{bg_image}");
+        background-size: cover;
+        background-repeat: no-repeat;
+        background-attachment: fixed;
+        color: {text_color};
+    }}
+
+    /* Global text color override for all markdown and text elements */
+    .stMarkdown {{
+        color: {text_color} !important;
+    }}
+    .stMarkdown p, .stMarkdown li, .stMarkdown h1, .stMarkdown h2, .stMarkdown h3 {{
+        color: {text_color} !important;
+    }}
+    .stText {{
+        color: {text_color} !important;
+    }}
+    label {{
+        color: {text_color} !important;
+    }}
+
+    /* Tabs background and text color */
+    .stTabs [role="tablist"] button[role="tab"] {{
+        background-color: {tab_bg_color} !important;
+        color: {tab_text_color} !important;
+        border: none !important;
+        padding: 0.5rem 1rem !important;
+        margin: 0 0.25rem !important;
+        border-radius: 0.25rem !important;
+    }}
+
+    .stTabs [role="tablist"] button[role="tab"][aria-selected="true"] {{
+        background-color: transparent !important;
+        color: {tab_text_color} !important;
+        border-bottom: none !important;
+        font-weight: bold;
+    }}
+
+    .stTabs [role="tablist"] button[role="tab"]:hover {{
+        background-color: transparent !important;
+        color: {tab_text_color} !important;
+    }}
+
+    /* Chat Messages Styling - Enhanced for full visibility */
+    .stChatMessage {{
+        background-color: transparent;
+    }}
+    .stChatMessage * {{
+        color: {text_color} !important;
+    }}
+    .stChatMessage [data-testid="chatAvatarIcon-user"] {{
+        background-color: {button_color};
+    }}
+    .stChatMessage [data-testid="chatAvatarIcon-assistant"] {{
+        background-color: {button_color};
+    }}
+
+    /* Ensure text is visible in both themes - Expanded */
+    .stChatMessage .stMarkdown p {{
+        color: {text_color} !important;
+        font-size: 16px;
+        line-height: 1.5;
+    }}
+
+    /* Input and form elements styling for visibility */
+    .stChatInput {{
+        background-color: rgba(255, 255, 255, 0.1) !important;
+        border: 1px solid rgba(255, 255, 255, 0.2) !important;
+        color: {text_color} !important;
+    }}
+    .stChatInput input {{
+        color: {text_color} !important;
+        background-color: rgba(255, 255, 255, 0.1) !important;
+    }}
+    .stTextInput > div > div > input {{
+        color: {text_color} !important;
+        background-color: rgba(255, 255, 255, 0.1) !important;
+    }}
+    .stTextArea > div > textarea {{
+        color: {text_color} !important;
+        background-color: rgba(255, 255, 255, 0.1) !important;
+    }}
+    .stSelectbox > div > div {{
+        color: {text_color} !important;
+    }}
+    .stFileUploader label {{
+        color: {text_color} !important;
+    }}
+    .stFileUploader > div > div {{
+        color: {text_color} !important;
+    }}
+
+    /* Streamlit Button Styling */
+    button[data-baseweb="button"] {{
+        background-color: {button_color} !important;
+        color: {button_text_color} !important;
+        border: none;
+        border-radius: 0.5rem;
+        padding: 0.5rem 1rem;
+        margin: 0.5rem 0;
+    }}
+
+    /* Fix label padding */
+    .block-container {{
+        padding-top: 2rem;
+        padding-bottom: 2rem;
+        padding-left: 3rem;
+        padding-right: 3rem;
+    }}
+
+    /* Sidebar styling */
+    .css-1d391kg {{
+        background-color: rgba(0, 0, 0, 0.1) !important;
+        color: {text_color} !important;
+    }}
+    .css-1d391kg * {{
+        color: {text_color} !important;
+    }}
+
+    /* Ensure all tab content text is visible */
+    section[data-testid="stHorizontalBlock"] * {{
+        color: {text_color} !important;
+    }}
+
+    /* Chat select buttons styling */
+    .stButton button[key^="select_"] {{
+        background: none !important;
+        border: none !important;
+        color: {text_color} !important;
+        text-align: left !important;
+        padding: 0 !important;
+        font-size: inherit !important;
+        width: 100% !important;
+        cursor: pointer !important;
+    }}
+    .stButton button[key^="select_"]:hover {{
+        background: rgba(255,255,255,0.1) !important;
+    }}
+
+    /* Chat delete buttons styling */
+    .stButton button[key^="delete_"] {{
+        background: none !important;
+        border: none !important;
+        color: #ff6b6b !important;
+        padding: 0 !important;
+        font-size: 16px !important;
+        cursor: pointer !important;
+    }}
+    .stButton button[key^="delete_"]:hover {{
+        background: rgba(255, 0, 0, 0.1) !important;
+    }}
+    </style>"""
+    return css
+
+
+def apply_theme(theme):
+    """Inject the memoized stylesheet for the current theme"""
+    st.markdown(build_theme_css(theme), unsafe_allow_html=True)
@@ -0,0 +1,42 @@
+import os
+import re
+import unicodedata
+from typing import Dict, Optional
+
+from cache import TieredCache
+
+_WHITESPACE = re.compile(r'\s+')
+
+# Segment-level translation memory shared by every session.
+# Set TRANSLATION_MEMORY_DIR to persist it across restarts.
+_memory = TieredCache(
+    maxsize=int(os.getenv("TRANSLATION_MEMORY_SIZE", "2048")),
+    directory=os.getenv("TRANSLATION_MEMORY_DIR") or None,
+    max_disk_entries=int(os.getenv("TRANSLATION_MEMORY_DISK_SIZE", "20000")),
+    name="translation_memory"
+)
+
+
+def normalize_segment(text: str) -> str:
+    """Normalize source text so trivially different copies share one entry"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def _key(text: str, dest_lang: str) -> str:
+    return f"{dest_lang}\x1f{normalize_segment(text)}"
+
+
+def lookup(text: str, dest_lang: str) -> Optional[str]:
+    """Return the remembered translation of a segment, or None"""
+    return _memory.get(_key(text, dest_lang))
+
+
+def remember(text: str, dest_lang: str, translation: str):
+    """Store the translation of a segment"""
+    if translation:
+        _memory.set(_key(text, dest_lang), translation)
+
+
+def get_stats() -> Dict[str, float]:
+    """Size and hit ratio of the translation memory"""
+    return _memory.stats()
@@ -1,86 +1,171 @@
+import json
+import os
+import re
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import streamlit as st
 import streamlit.components.v1 as components
 
-def speak_text_component(text):
-    """Custom TTS component using browser speech synthesis"""
-    if not text or not text.strip():
-        return
+from utils import chunk_text, split_sentences
+
+# Longest piece spoken as one utterance; browsers stall or cut off long ones
+TTS_CHUNK_CHARS = int(os.getenv("TTS_CHUNK_CHARS", "200"))
+
+# Speech synthesis locale per app language code
+SPEECH_LANGS = {"en": "en-IN", "hi": "hi-IN", "kn": "kn-IN", "te": "te-IN", "ta": "ta-IN", "mr": "mr-IN"}
+
+# Markdown markup that would otherwise be read out; ">" only as a
+# line-leading blockquote marker, so "BP > 140" keeps its comparison
+_MARKDOWN = re.compile(r'[*_`#]+|^\s*>+\s?|^\s*[-+]\s+', re.MULTILINE)
+
+# The component HTML never changes; only the JSON payload differs per call
+_TEMPLATE = """
+<div id="tts-container">
+    <button id="tts-button" style="background-color: #4CAF50; color: white; border: none; padding: 10px 20px; border-radius: 5px; cursor: pointer; font-size: 16px;">
+        🔊 Speak
+    </button>
+    <div id="tts-status" style="margin-top: 10px; font-size: 14px;"></div>
+</div>
+
+<script>
+    (function() {
+        const payload = __TTS_PAYLOAD__;
+        const button = document.getElementById('tts-button');
+        const statusDiv = document.getElementById('tts-status');
+        let isSpeaking = false;
+        // Events of utterances from an earlier click are ignored
+        let run = 0;
+
+        function setStatus(text, color) {
+            statusDiv.textContent = text;
+            statusDiv.style.color = color || '';
+        }
+
+        function reset() {
+            isSpeaking = false;
+            button.textContent = '🔊 Speak';
+        }
+
+        function pickVoice() {
+            const prefix = payload.lang.split('-')[0];
+            const voices = speechSynthesis.getVoices();
+            return voices.find(v => v.lang.replace('_', '-') === payload.lang)
+                || voices.find(v => v.lang.toLowerCase().startsWith(prefix))
+                || null;
+        }
+
+        button.addEventListener('click', function() {
+            if (!('speechSynthesis' in window)) {
+                setStatus('Speech synthesis not supported in this browser.', 'red');
+                return;
+            }
+
+            // Stop current speech (also drops the queued sentences)
+            speechSynthesis.cancel();
+            if (isSpeaking) {
+                run++;
+                reset();
+                setStatus('Speech stopped');
+                return;
+            }
+
+            // Queue every sentence up front: speech starts with the first
+            // one while the rest wait in the browser's utterance queue
+            const current = ++run;
+            const voice = pickVoice();
+            const total = payload.chunks.length;
+            payload.chunks.forEach(function(chunk, index) {
+                const utterance = new SpeechSynthesisUtterance(chunk);
+                utterance.lang = payload.lang;
+                if (voice) {
+                    utterance.voice = voice;
+                }
+                utterance.rate = payload.rate;
+                utterance.pitch = 1;
+
+                utterance.onstart = function() {
+                    if (current !== run) {
+                        return;
+                    }
+                    isSpeaking = true;
+                    button.textContent = '⏹️ Stop';
+                    setStatus('Speaking... (' + (index + 1) + '/' + total + ')', 'green');
+                };
+
+                utterance.onend = function() {
+                    if (current === run && index === total - 1) {
+                        reset();
+                        setStatus('Speech completed', 'blue');
+                    }
+                };
 
-    # Escape special characters for JavaScript
-    escaped_text = text.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n').replace('\r', '\\r').replace('\t', '\\t')
-
-    html_code = f"""
-    <div id="tts-container">
-        <button id="tts-button" style="background-color: #4CAF50; color: white; border: none; padding: 10px 20px; border-radius: 5px; cursor: pointer; font-size: 16px;">
-            🔊 Speak
-        </button>
-        <div id="tts-status" style="margin-top: 10px; font-size: 14px;"></div>
-    </div>
-
-    <script>
-        (function() {{
-            const button = document.getElementById('tts-button');
-            const statusDiv = document.getElementById('tts-status');
-            let isSpeaking = false;
-
-            button.addEventListener('click', function() {{
-                if (isSpeaking) {{
-                    // Stop current speech
-                    if ('speechSynthesis' in window) {{
+                utterance.onerror = function(event) {
+                    if (current !== run) {
+                        return;
+                    }
+                    reset();
+                    if (event.error !== 'interrupted' && event.error !== 'canceled') {
                         speechSynthesis.cancel();
-                    }}
-                    isSpeaking = false;
-                    button.textContent = '🔊 Speak';
-                    statusDiv.textContent = 'Speech stopped';
-                    return;
-                }}
-
-                if ('speechSynthesis' in window) {{
-                    const utterance = new SpeechSynthesisUtterance("{escaped_text}");
-                    utterance.lang = 'en-US';
-                    utterance.rate = 0.9;
-                    utterance.pitch = 1;
-
-                    utterance.onstart = function() {{
-                        isSpeaking = true;
-                        button.textContent = '⏹️ Stop';
-                        statusDiv.textContent = 'Speaking...';
-                        statusDiv.style.color = 'green';
-                    }};
-
-                    utterance.onend = function() {{
-                        isSpeaking = false;
-                        button.textContent = '🔊 Speak';
-                        statusDiv.textContent = 'Speech completed';
-                        statusDiv.style.color = 'blue';
-                    }};
-
-                    utterance.onerror = function(event) {{
-                        isSpeaking = false;
-                        button.textContent = '🔊 Speak';
-                        if (event.error !== 'interrupted') {{
-                            statusDiv.textContent = 'Speech synthesis error: ' + event.error;
-                            statusDiv.style.color = 'red';
-                        }} else {{
-                            statusDiv.textContent = '';
-                        }}
-                    }};
-
-                    speechSynthesis.speak(utterance);
-                }} else {{
-                    statusDiv.textContent = 'Speech synthesis not supported in this browser.';
-                    statusDiv.style.color = 'red';
-                }}
-            }});
-        }})();
-    </script>
+                        setStatus('Speech synthesis error: ' + event.error, 'red');
+                    }
+                };
+
+                speechSynthesis.speak(utterance);
+            });
+        });
+    })();
+</script>
+"""
+_TEMPLATE_HEAD, _TEMPLATE_TAIL = _TEMPLATE.split("__TTS_PAYLOAD__")
+
+
+def speech_chunks(text: str, max_chars: int = TTS_CHUNK_CHARS) -> List[str]:
+    """Split text into sentence-sized pieces of at most max_chars characters"""
+    chunks = []
+    for sentence in split_sentences(_MARKDOWN.sub("", text)):
+        chunks.extend(chunk_text(sentence, max_chars))
+    return chunks
+
+
+@lru_cache(maxsize=64)
+def build_component_html(text: str, lang: str, rate: float = 0.9) -> str:
+    """Component HTML for one text; memoized, since reruns repeat the same reply"""
+    payload = {"chunks": speech_chunks(text), "lang": lang, "rate": rate}
+    # JSON is valid JavaScript; escaping "<" keeps "</script>" in the text inert
+    return _TEMPLATE_HEAD + json.dumps(payload).replace("<", "\\u003c") + _TEMPLATE_TAIL
+
+
+def speak_text_component(text, lang: Optional[str] = None):
+    """
+    Custom TTS component using browser speech synthesis.
+
+    The text is spoken sentence by sentence, starting as soon as the first
+    sentence is queued. `lang` is an app language code ("en", "hi", "ta", ...)
+    and defaults to the sidebar language preference.
     """
+    if not text or not text.strip():
+        return
+
+    lang = lang or st.session_state.get("language_preference", "en")
+    components.html(build_component_html(text, SPEECH_LANGS.get(lang, lang)), height=100)
+
+
+def _last_reply(chat_history) -> Tuple[Optional[str], Optional[str]]:
+    last_assistant_msg = next((msg for msg in reversed(chat_history) if msg["role"] == "assistant"), None)
+    if last_assistant_msg is None:
+        return None, None
+    # Speak what is on screen: the translation when the toggle shows it
+    translated = st.session_state.get("translated_last")
+    if st.session_state.get("translate_last") and translated:
+        return translated, None
+    return last_assistant_msg["content"], "en"
 
-    components.html(html_code, height=100)
 
 def speak_last_response(chat_history):
     """Speak the last assistant response from chat history"""
-    last_assistant_msg = next((msg for msg in reversed(chat_history) if msg["role"] == "assistant"), None)
-    if last_assistant_msg:
-        speak_text_component(last_assistant_msg["content"])
+    text, lang = _last_reply(chat_history)
+    if text:
+        speak_text_component(text, lang)
     else:
         components.html('<div style="color: orange;">No assistant message to speak.</div>', height=30)
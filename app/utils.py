@@ -0,0 +1,106 @@
+import os
+import re
+from typing import List
+
+# Sentence boundary: ., ! or ? (also the Devanagari danda) followed by whitespace
+_SENTENCE_END = re.compile(r'(?<=[.!?।])\s+')
+_PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences, keeping the closing punctuation"""
+    sentences = []
+    for line in text.splitlines():
+        sentences.extend(s.strip() for s in _SENTENCE_END.split(line) if s.strip())
+    return sentences
+
+
+def split_paragraphs(text: str) -> List[str]:
+    """Split text on blank lines into stripped, non-empty paragraphs"""
+    return [p.strip() for p in _PARAGRAPH_BREAK.split(text.strip()) if p.strip()]
+
+
+def _split_long(sentence: str, max_chars: int) -> List[str]:
+    """Hard-wrap a single sentence longer than max_chars on word boundaries"""
+    pieces, current = [], ""
+    for word in sentence.split():
+        while len(word) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(word[:max_chars])
+            word = word[max_chars:]
+        candidate = f"{current} {word}" if current else word
+        if len(candidate) > max_chars:
+            pieces.append(current)
+            current = word
+        else:
+            current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_text(text: str, max_chars: int = 1500) -> List[str]:
+    """
+    Split text into chunks of at most max_chars characters.
+
+    Paragraphs are kept together where possible, then split on sentence
+    boundaries, and only very long sentences are split between words.
+
+    Args:
+        text: Text to split
+        max_chars: Maximum characters per chunk
+
+    Returns:
+        List of chunks in original order
+    """
+    chunks, current = [], ""
+
+    def flush():
+        nonlocal current
+        if current:
+            chunks.append(current)
+            current = ""
+
+    for paragraph in split_paragraphs(text):
+        if len(paragraph) <= max_chars:
+            if current and len(current) + 2 + len(paragraph) > max_chars:
+                flush()
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+            continue
+
+        # Paragraph too long - pack its sentences instead
+        flush()
+        for sentence in split_sentences(paragraph):
+            for piece in _split_long(sentence, max_chars) if len(sentence) > max_chars else [sentence]:
+                if current and len(current) + 1 + len(piece) > max_chars:
+                    flush()
+                current = f"{current} {piece}" if current else piece
+        flush()
+
+    flush()
+    return chunks
+
+
+def read_source(source):
+    """
+    Return the bytes of an upload without touching disk where possible.
+
+    Accepts a file path, bytes / bytearray / memoryview (e.g. the result of
+    UploadedFile.getbuffer()) or a file-like object. Buffers are returned
+    as-is, without copying.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return source
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return f.read()
+    if hasattr(source, "getbuffer"):
+        return source.getbuffer()
+    return source.read()
+
+
+def is_pdf(data) -> bool:
+    """Detect PDF content from its magic number"""
+    return bytes(data[:5]) == b"%PDF-"
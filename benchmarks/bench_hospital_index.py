@@ -0,0 +1,72 @@
+"""
+Hospital index query benchmark.
+
+Builds HospitalIndex over synthetic hospitals spread across India's bounding
+box and reports build time and mean radius-query latency as the dataset
+grows to country scale, compared with a brute-force haversine scan.
+
+Usage:
+    python benchmarks/bench_hospital_index.py [--sizes 1000 10000 100000 1000000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from hospital_index import HospitalIndex, haversine_m  # noqa: E402
+
+INDIA_LAT = (8.0, 35.0)
+INDIA_LON = (68.0, 97.0)
+
+
+def synthetic_records(n, rng):
+    lats = rng.uniform(*INDIA_LAT, n)
+    lons = rng.uniform(*INDIA_LON, n)
+    categories = rng.choice(["general", "specialized"], n)
+    return [
+        {"name": f"Hospital {i}", "category": c, "emergency": "yes", "open_24h": "yes",
+         "latitude": lat, "longitude": lon}
+        for i, (lat, lon, c) in enumerate(zip(lats, lons, categories))
+    ]
+
+
+def mean_ms(fn, queries):
+    start = time.perf_counter()
+    for lat, lon in queries:
+        fn(lat, lon)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--radius", type=int, default=5000, help="search radius in meters")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    queries = list(zip(rng.uniform(*INDIA_LAT, args.queries), rng.uniform(*INDIA_LON, args.queries)))
+
+    print(f"{'hospitals':>10} {'build s':>9} {'index ms':>9} {'brute ms':>9}")
+    for size in args.sizes:
+        records = synthetic_records(size, rng)
+        start = time.perf_counter()
+        index = HospitalIndex(records)
+        build = time.perf_counter() - start
+
+        def brute(lat, lon):
+            distances = haversine_m(lat, lon, index.lats, index.lons)
+            within = np.flatnonzero(distances <= args.radius)
+            return within[np.argsort(distances[within])][:10]
+
+        indexed = mean_ms(lambda lat, lon: index.query(lat, lon, args.radius, 10), queries)
+        brute_ms = mean_ms(brute, queries)
+        print(f"{size:>10} {build:>9.2f} {indexed:>9.3f} {brute_ms:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""
+Offline pipeline benchmark.
+
+Runs chat_with_bot, analyze_medical_image, extract_text (PDF and image
+paths) and translate_text against a local OpenRouter stand-in and stubbed
+GoogleTranslator / Nominatim, across input sizes. Reports throughput,
+p50/p95 latency and peak traced memory, and writes the results as JSON so
+runs can be compared between releases. No network access is needed.
+Latency is timed with tracemalloc off; peak memory comes from a separate
+traced pass of `concurrency` calls, since tracing slows every allocation.
+
+Caches are cleared before every call, so the numbers measure real work.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--iterations 20] [--concurrency 1]
+        [--latency 0.05] [--rate-limit 0.0] [--only chat translate]
+        [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(BENCH_DIR, "..", "app")
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, APP_DIR)
+
+import stubs  # noqa: E402
+from fake_openrouter import FakeConfig, FakeOpenRouter  # noqa: E402
+
+BENCHMARKS = ("chat", "image_analysis", "extract_pdf", "extract_image", "translate")
+SIZES = {
+    "chat": [10, 200, 1000],             # prompt words
+    "image_analysis": [512, 1536, 3072],  # longest image side (px)
+    "extract_pdf": [1, 10, 50],           # pages
+    "extract_image": [1024, 2048],        # longest image side (px)
+    "translate": [500, 5000, 20000],      # characters
+}
+SAMPLE_TEXT = (
+    "Haemoglobin 13.2 g/dL within the reference range. Total leukocyte count is mildly elevated, "
+    "suggesting a possible infection. Platelets are adequate. Fasting blood glucose is 112 mg/dL, "
+    "which is borderline and should be rechecked. "
+)
+# p95 / throughput change that counts as a regression in --compare
+REGRESSION_THRESHOLD = 0.2
+
+
+def make_text(chars):
+    return (SAMPLE_TEXT * (chars // len(SAMPLE_TEXT) + 1))[:chars]
+
+
+def make_image(side, seed):
+    """Noise image that doesn't compress away, different for every seed"""
+    import numpy as np
+    from PIL import Image
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 256, (side, side * 3 // 4, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def make_pdf(pages, lines_per_page=40):
+    """Minimal text-only PDF with `pages` pages"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(pages):
+        lines = [f"Page {page + 1} line {i + 1}: {SAMPLE_TEXT[:80]}" for i in range(lines_per_page)]
+        text = " T* ".join(f"({line})" + " Tj" for line in lines)
+        stream = f"BT /F1 9 Tf 11 TL 36 800 Td {text} ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>".encode("ascii")
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def load_app():
+    """Import the app modules wired to the stand-ins"""
+    stubs.install()
+    import chat
+    import image_analysis
+    import report_translator
+    import response_cache
+    import translation_memory
+
+    # No Streamlit secrets outside `streamlit run`
+    for module, name in ((chat, "get_api_key"), (image_analysis, "get_api_key"),
+                         (report_translator, "get_api_key"), (report_translator, "get_vision_api_key")):
+        setattr(module, name, lambda: "bench-key")
+
+    def clear_caches():
+        response_cache.response_cache._answers.clear()
+        image_analysis._analysis_cache.memory.clear()
+        report_translator._extraction_cache.memory.clear()
+        translation_memory._memory.memory.clear()
+
+    return chat, image_analysis, report_translator, clear_caches
+
+
+def is_error(result):
+    text = result[0] if isinstance(result, tuple) else result
+    return isinstance(text, str) and (text.startswith("❌") or text.startswith("Error"))
+
+
+def make_call(name, size, modules):
+    """Return a function running one call of benchmark `name` for input number i"""
+    chat, image_analysis, report_translator, _ = modules
+    if name == "chat":
+        words = " ".join(make_text(size * 6).split()[:size])
+        return lambda i: chat.chat_with_bot([{"role": "user", "content": f"Question {i}: {words}"}])
+    if name == "image_analysis":
+        images = [make_image(size, seed) for seed in range(4)]
+        return lambda i: image_analysis.analyze_medical_image(images[i % len(images)], "X-ray")
+    if name == "extract_pdf":
+        pdf = make_pdf(size)
+        return lambda i: report_translator.extract_text(pdf)
+    if name == "extract_image":
+        images = [make_image(size, seed) for seed in range(4)]
+        return lambda i: report_translator.extract_text(images[i % len(images)])
+    if name == "translate":
+        text = make_text(size)
+
+        def translate(i):
+            source = f"{i}. {text}"
+            result = report_translator.translate_text(source, dest_lang="hi")
+            # Fallbacks hand back the source text, translated without being
+            # simplified or not at all, instead of an error
+            if any(segment in result for segment in report_translator.translation_segments(source)):
+                return "Error: translate_text fell back to the source text"
+            return result
+
+        return translate
+    raise ValueError(name)
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def run_benchmark(name, size, modules, iterations, concurrency):
+    from clients import get_connection_stats
+    clear_caches = modules[3]
+    call = make_call(name, size, modules)
+
+    def timed(i):
+        clear_caches()
+        start = time.perf_counter()
+        result = call(i)
+        return time.perf_counter() - start, is_error(result)
+
+    def run(calls):
+        if concurrency > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                return list(executor.map(timed, calls))
+        return [timed(i) for i in calls]
+
+    timed(-1)  # warm up clients, pools and imports
+    connections_before = get_connection_stats()
+    start = time.perf_counter()
+    samples = run(range(iterations))
+    wall = time.perf_counter() - start
+    connections = get_connection_stats()
+
+    # Memory pass: tracing would inflate the timings above several times
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    run(range(iterations, iterations + concurrency))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = [latency for latency, _ in samples]
+    return {
+        "benchmark": name,
+        "size": size,
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "throughput_per_s": round(iterations / wall, 3),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "peak_mem_mb": round(peak / 2 ** 20, 2),
+        "errors": sum(1 for _, error in samples if error),
+        # Keep-alive reuse of the shared OpenRouter pool during the timed calls
+        "new_connections": connections["new_connections"] - connections_before["new_connections"],
+        "reused_connections": connections["reused_connections"] - connections_before["reused_connections"],
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline_path):
+    """Print changes against a baseline run; return the number of regressions"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(r["benchmark"], r["size"]): r for r in json.load(f)["results"]}
+    regressions = 0
+    print(f"\nCompared with {baseline_path}:")
+    for result in results:
+        before = baseline.get((result["benchmark"], result["size"]))
+        if before is None:
+            continue
+        p95_change = result["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0.0
+        throughput_change = (result["throughput_per_s"] / before["throughput_per_s"] - 1
+                             if before["throughput_per_s"] else 0.0)
+        regressed = p95_change > REGRESSION_THRESHOLD or throughput_change < -REGRESSION_THRESHOLD
+        regressions += regressed
+        print(f"  {result['benchmark']:<15}{result['size']:>7}  p95 {p95_change:+.0%}  "
+              f"throughput {throughput_change:+.0%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=1, help="calls in flight at once")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument("--latency", type=float, default=0.05, help="fake model seconds before the first byte")
+    parser.add_argument("--token-delay", type=float, default=0.001, help="fake model seconds per token")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="fraction of model requests answered with 429")
+    parser.add_argument("--translate-latency", type=float, default=stubs.TRANSLATE_LATENCY)
+    parser.add_argument("--output", default=None, help="JSON results path (default benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", default=None, help="baseline JSON; exit 1 on regressions")
+    args = parser.parse_args()
+
+    config = FakeConfig(args.latency, args.token_delay, rate_limit=args.rate_limit)
+    server = FakeOpenRouter(config).start()
+    os.environ["OPENROUTER_BASE_URL"] = server.base_url
+    # Persistent cache tiers would survive clear_caches() and skew repeat runs
+    for name in ("REPORT_CACHE_DIR", "IMAGE_ANALYSIS_CACHE_DIR", "TRANSLATION_MEMORY_DIR"):
+        os.environ.pop(name, None)
+    stubs.TRANSLATE_LATENCY = args.translate_latency
+    modules = load_app()
+    from clients import get_connection_stats
+
+    results = []
+    print(f"{'benchmark':<15}{'size':>7}{'calls/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'peak MB':>9}{'errors':>8}")
+    try:
+        for name in args.only:
+            for size in SIZES[name]:
+                result = run_benchmark(name, size, modules, args.iterations, args.concurrency)
+                results.append(result)
+                print(f"{name:<15}{size:>7}{result['throughput_per_s']:>10.2f}{result['p50_ms']:>10.1f}"
+                      f"{result['p95_ms']:>10.1f}{result['peak_mem_mb']:>9.1f}{result['errors']:>8}")
+    finally:
+        server.stop()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "config": {
+            "iterations": args.iterations,
+            "concurrency": args.concurrency,
+            "latency": args.latency,
+            "token_delay": args.token_delay,
+            "rate_limit": args.rate_limit,
+            "translate_latency": args.translate_latency,
+        },
+        "server": config.stats(),
+        "stub_calls": dict(stubs.calls),
+        "connections": get_connection_stats(),
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        BENCH_DIR, "results", f"pipeline-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare and compare(results, args.compare):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
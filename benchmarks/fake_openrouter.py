@@ -0,0 +1,194 @@
+"""
+Local stand-in for the OpenRouter chat-completions endpoint.
+
+Serves POST .../chat/completions on localhost with a configurable latency,
+optional SSE streaming and injected 429 responses, so the pipeline can be
+benchmarked with no network.
+
+Usage (standalone):
+    python benchmarks/fake_openrouter.py [--port 8799] [--latency 0.05] [--rate-limit 0.1]
+
+Then point the app at it with OPENROUTER_BASE_URL=http://127.0.0.1:8799/api/v1.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "the patient shows no acute findings mild inflammation is noted follow up with "
+    "a physician is advised results are within normal limits hydration and rest recommended"
+).split()
+
+
+class FakeConfig:
+    """Behaviour of the fake endpoint; can be changed while it is running"""
+
+    def __init__(self, latency=0.05, token_delay=0.001, reply_tokens=64,
+                 rate_limit=0.0, retry_after=0.05, seed=42):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.reply_tokens = reply_tokens
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.rate_limited = 0
+
+    def admit(self) -> bool:
+        """Count a request and decide whether it gets a 429"""
+        with self._lock:
+            self.requests += 1
+            limited = self._random.random() < self.rate_limit
+            if limited:
+                self.rate_limited += 1
+            return not limited
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "rate_limited": self.rate_limited}
+
+
+def _reply_words(count):
+    return [WORDS[i % len(WORDS)] for i in range(count)]
+
+
+def _usage(request_body, completion_tokens):
+    # Rough prompt size: 4 characters per token, like chat_context
+    prompt_tokens = len(json.dumps(request_body.get("messages", []))) // 4
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config: FakeConfig = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        config = self.config
+        if not config.admit():
+            self._send_json(
+                429,
+                {"error": {"message": "Rate limit exceeded", "code": 429}},
+                {"Retry-After": f"{config.retry_after:g}"}
+            )
+            return
+
+        model = body.get("model", "fake-model")
+        tokens = min(config.reply_tokens, int(body.get("max_tokens") or config.reply_tokens))
+        words = _reply_words(tokens)
+        created = int(time.time())
+        time.sleep(config.latency)
+
+        if not body.get("stream"):
+            time.sleep(config.token_delay * tokens)
+            self._send_json(200, {
+                "id": "fake-completion",
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(words)},
+                    "finish_reason": "stop",
+                }],
+                "usage": _usage(body, tokens),
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for index, word in enumerate(words):
+            time.sleep(config.token_delay)
+            chunk = {
+                "id": "fake-completion",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": word if index == 0 else f" {word}"},
+                    "finish_reason": None,
+                }],
+            }
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+
+class FakeOpenRouter:
+    """The fake endpoint running on a background thread"""
+
+    def __init__(self, config: FakeConfig = None, port: int = 0):
+        self.config = config or FakeConfig()
+        handler = type("Handler", (_Handler,), {"config": self.config})
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-openrouter", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/v1"
+
+    def start(self) -> "FakeOpenRouter":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds before the first byte")
+    parser.add_argument("--token-delay", type=float, default=0.001, help="seconds per generated token")
+    parser.add_argument("--reply-tokens", type=int, default=64)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="fraction of requests answered with 429")
+    args = parser.parse_args()
+
+    server = FakeOpenRouter(FakeConfig(args.latency, args.token_delay, args.reply_tokens, args.rate_limit), args.port)
+    server.start()
+    print(f"Fake OpenRouter listening on {server.base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Entry script for load-test sessions.
+
+Streamlit's AppTest can't upload files, so this wrapper replaces
+st.file_uploader with one that returns the files a session queued in
+st.session_state["load_test_uploads"] ({"image": [...], "report": [...]}),
+then runs app.py unchanged.
+"""
+import io
+import os
+import runpy
+
+import streamlit as st
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app", "app.py")
+
+# Which queued uploads answer which uploader (matched on its label)
+UPLOADER_KINDS = (("medical images", "image"), ("image or PDF", "report"))
+
+
+class FakeUpload(io.BytesIO):
+    """Just enough of UploadedFile for app.py"""
+
+    def __init__(self, name, data, mime):
+        super().__init__(data)
+        self.name = name
+        self.type = mime
+        self.size = len(data)
+        self.file_id = f"{name}-{len(data)}"
+
+
+def _fake_file_uploader(label, *args, accept_multiple_files=False, **kwargs):
+    uploads = st.session_state.get("load_test_uploads", {})
+    kind = next((kind for text, kind in UPLOADER_KINDS if text in label), None)
+    files = [FakeUpload(*entry) for entry in uploads.get(kind, [])]
+    if accept_multiple_files:
+        return files
+    return files[0] if files else None
+
+
+if st.file_uploader is not _fake_file_uploader:
+    st.file_uploader = _fake_file_uploader
+
+runpy.run_path(APP_PATH, run_name="__main__")
@@ -0,0 +1,308 @@
+"""
+Concurrent-session load test for the Streamlit app.
+
+Drives many headless sessions of app.py (via Streamlit's AppTest) through
+a mix of realistic journeys - chat turns, image uploads, report uploads
+with a translate click (waiting for the background job) and hospital searches - against the local
+OpenRouter stand-in and stubbed translation / geocoding. AppTest keeps its
+runtime and secrets in process-wide state, so concurrent sessions run in
+separate worker processes, one session at a time each. Concurrency is
+ramped step by step; each step reports sessions/sec, per-tab latency
+percentiles and memory per session, and the first step that breaks the
+p95 target or stops adding throughput is reported as the saturation point.
+A step fails on an exception, on a new error message or error reply, on
+any error mentioning "failed", or when a report job doesn't finish within
+the timeout.
+
+Usage:
+    python benchmarks/load_test.py [--levels 1 2 4 8 16 32] [--sessions-per-level 20]
+        [--mix chat=4,image=2,report=2,hospital=2] [--slo 5.0] [--output load.json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+import stubs  # noqa: E402
+from bench_pipeline import git_commit, make_image, make_pdf, percentile  # noqa: E402
+from fake_openrouter import FakeConfig, FakeOpenRouter  # noqa: E402
+
+DRIVER_PATH = os.path.join(BENCH_DIR, "load_app_driver.py")
+DEFAULT_MIX = "chat=4,image=2,report=2,hospital=2"
+QUESTIONS = [
+    "What are the symptoms of dengue?",
+    "How much paracetamol can an adult take in a day?",
+    "Is a resting heart rate of 95 normal?",
+    "What should I eat with type 2 diabetes?",
+    "When is a fever in a child an emergency?",
+]
+CITIES = ["Mumbai", "Bangalore", "Chennai", "Hyderabad", "Pune", "Mysuru", "Jaipur"]
+API_KEY_NAMES = ("OPENROUTER_API_KEY", "OPENROUTER_Report_API_KEY", "OPENROUTER_API_KEY_VISION")
+# Seconds between polls of a running report job, like the page itself
+REPORT_POLL_SECONDS = 0.25
+# A throughput gain below this between steps counts as saturation
+MIN_SCALING_GAIN = 0.05
+
+
+def rss_mb():
+    """Current resident set size (falls back to peak RSS off Linux)"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+class Session:
+    """One simulated user; every step is a timed script run"""
+
+    def __init__(self, rng, timeout):
+        from streamlit.testing.v1 import AppTest
+        self.rng = rng
+        self.timeout = timeout
+        self.app = AppTest.from_file(DRIVER_PATH, default_timeout=timeout)
+        for name in API_KEY_NAMES:
+            self.app.secrets[name] = os.environ[name]
+        self.timings = []
+
+    def _errors(self):
+        """Error messages on the page, including replies that report one ("❌ ...")"""
+        return ([str(error.value) for error in self.app.error]
+                + [str(text.value) for text in self.app.markdown if str(text.value).startswith("❌")])
+
+    def step(self, tab, action):
+        errors_before = len(self._errors())
+        start = time.perf_counter()
+        completed = action()
+        elapsed = time.perf_counter() - start
+        errors = self._errors()
+        failed = (completed is False or bool(self.app.exception) or len(errors) > errors_before
+                  or any("failed" in error.lower() for error in errors))
+        self.timings.append((tab, elapsed, failed))
+
+    def _button(self, label):
+        return next(button for button in self.app.button if button.label.startswith(label))
+
+    def open(self):
+        self.step("load", lambda: self.app.run())
+
+    def chat(self, turns=2):
+        for _ in range(turns):
+            question = f"{self.rng.choice(QUESTIONS)} ({self.rng.randrange(10 ** 6)})"
+            self.step("Chat", lambda: self.app.chat_input[0].set_value(question).run())
+
+    def image(self):
+        count = self.rng.randint(1, 3)
+        self.app.session_state["load_test_uploads"] = {
+            "image": [(f"xray-{i}.jpg", make_image(1024, self.rng.randrange(10 ** 6)), "image/jpeg")
+                      for i in range(count)]
+        }
+        self.step("Image Analysis", lambda: self.app.run())
+        self.step("Image Analysis", lambda: self._button("Analyze").click().run())
+
+    def report(self):
+        if self.rng.random() < 0.5:
+            upload = ("report.pdf", make_pdf(self.rng.randint(1, 5)), "application/pdf")
+        else:
+            upload = ("report.jpg", make_image(1024, self.rng.randrange(10 ** 6)), "image/jpeg")
+        self.app.session_state["load_test_uploads"] = {"report": [upload]}
+        self.step("Report Reader", lambda: self.app.run())
+        self.step("Report Reader", lambda: self._button("🌐 Translate").click().run())
+        # Extraction and translation run as background jobs; time how long
+        # the user waits (polling like the page does) until the result shows
+        self.step("Report job", self._wait_for_translation)
+
+    def _wait_for_translation(self):
+        """False if the jobs failed or didn't finish within the timeout"""
+        deadline = time.monotonic() + self.timeout
+        while not any(area.label == "🌍 Translation:" for area in self.app.text_area):
+            if self.app.exception or self.app.error or time.monotonic() > deadline:
+                return False
+            time.sleep(REPORT_POLL_SECONDS)
+            self.app.run()
+        return True
+
+    def hospital(self):
+        city = self.rng.choice(CITIES)
+        self.step("Hospital Locator", lambda: self.app.text_input(key="location_input").set_value(city).run())
+        self.step("Hospital Locator", lambda: self._button("🔍 Find Hospitals").click().run())
+
+
+def _init_worker(ready):
+    """Load the stand-ins and Streamlit before the level's clock starts"""
+    stubs.install()
+    from streamlit.testing.v1 import AppTest  # noqa: F401
+    ready.wait()
+
+
+def run_session(journey, seed, timeout):
+    """One session in a worker process: (step timings, peak RSS growth, peak RSS)"""
+    rss_before = rss_mb()
+    peak_rss = [rss_before]
+    stop = threading.Event()
+
+    def sample_memory():
+        while not stop.wait(0.2):
+            peak_rss[0] = max(peak_rss[0], rss_mb())
+
+    sampler = threading.Thread(target=sample_memory, daemon=True)
+    sampler.start()
+    try:
+        session = Session(random.Random(seed), timeout)
+        session.open()
+        getattr(session, journey)()
+    finally:
+        stop.set()
+        sampler.join()
+    peak_rss[0] = max(peak_rss[0], rss_mb())
+    return session.timings, peak_rss[0] - rss_before, peak_rss[0]
+
+
+def run_level(concurrency, sessions, mix, timeout, seed):
+    rng = random.Random(seed)
+    journeys = rng.choices(list(mix), weights=list(mix.values()), k=sessions)
+    # AppTest swaps out __main__ in the workers, so tasks must name their
+    # functions by this module's importable name
+    import load_test
+
+    # Fresh interpreters, so nothing is shared between concurrent AppTests
+    context = multiprocessing.get_context("spawn")
+    ready = context.Barrier(concurrency + 1)
+    with context.Pool(concurrency, initializer=load_test._init_worker, initargs=(ready,)) as pool:
+        ready.wait()
+        start = time.perf_counter()
+        results = pool.starmap(
+            load_test.run_session,
+            [(journey, seed * 1000 + i, timeout) for i, journey in enumerate(journeys)],
+            chunksize=1
+        )
+        wall = time.perf_counter() - start
+
+    per_tab = defaultdict(list)
+    errors = 0
+    for timings, _, _ in results:
+        for tab, elapsed, failed in timings:
+            per_tab[tab].append(elapsed)
+            errors += failed
+    all_steps = [elapsed for values in per_tab.values() for elapsed in values]
+    return {
+        "concurrency": concurrency,
+        "sessions": sessions,
+        "sessions_per_s": round(sessions / wall, 3),
+        "p95_ms": round(percentile(all_steps, 0.95) * 1000, 1),
+        "tabs": {
+            tab: {
+                "steps": len(values),
+                "p50_ms": round(percentile(values, 0.5) * 1000, 1),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 1),
+            }
+            for tab, values in sorted(per_tab.items())
+        },
+        "mem_per_session_mb": round(sum(max(growth, 0.0) for _, growth, _ in results) / len(results), 2),
+        "rss_mb": round(max(rss for _, _, rss in results), 1),
+        "errors": errors,
+    }
+
+
+def find_saturation(levels, slo_ms):
+    """First level that breaks the p95 target or stops adding throughput"""
+    previous = None
+    for level in levels:
+        if level["p95_ms"] > slo_ms:
+            return {"concurrency": level["concurrency"], "reason": f"p95 {level['p95_ms']:.0f} ms > {slo_ms:.0f} ms"}
+        if previous and level["sessions_per_s"] < previous["sessions_per_s"] * (1 + MIN_SCALING_GAIN):
+            return {"concurrency": level["concurrency"], "reason": "throughput stopped scaling"}
+        previous = level
+    return None
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("chat", "image", "report", "hospital"):
+            raise argparse.ArgumentTypeError(f"unknown journey {name!r}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32], help="concurrent sessions per step")
+    parser.add_argument("--sessions-per-level", type=int, default=20)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help="journey weights")
+    parser.add_argument("--slo", type=float, default=5.0, help="p95 step latency target in seconds")
+    parser.add_argument("--latency", type=float, default=0.5, help="fake model seconds before the first byte")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="fake model seconds per token")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="fraction of model requests answered with 429")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds allowed per script run")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default=None, help="JSON results path (default benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args()
+
+    config = FakeConfig(args.latency, args.token_delay, rate_limit=args.rate_limit)
+    server = FakeOpenRouter(config).start()
+    # Inherited by the worker processes
+    os.environ["OPENROUTER_BASE_URL"] = server.base_url
+    for name in API_KEY_NAMES:
+        os.environ[name] = "load-test"
+
+    levels = []
+    print(f"{'sessions':>9}{'sessions/s':>12}{'p95 ms':>10}{'MB/session':>12}{'errors':>8}  per-tab p95 ms")
+    try:
+        for index, concurrency in enumerate(args.levels):
+            sessions = max(args.sessions_per_level, concurrency)
+            level = run_level(concurrency, sessions, args.mix, args.timeout, args.seed + index)
+            levels.append(level)
+            tabs = ", ".join(f"{tab} {stats['p95_ms']:.0f}" for tab, stats in level["tabs"].items())
+            print(f"{concurrency:>9}{level['sessions_per_s']:>12.2f}{level['p95_ms']:>10.0f}"
+                  f"{level['mem_per_session_mb']:>12.1f}{level['errors']:>8}  {tabs}")
+    finally:
+        server.stop()
+
+    saturation = find_saturation(levels, args.slo * 1000)
+    if saturation:
+        print(f"\nSaturation at {saturation['concurrency']} concurrent sessions: {saturation['reason']}")
+    else:
+        print("\nNo saturation within the tested levels")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+        },
+        "config": {
+            "mix": args.mix,
+            "slo_s": args.slo,
+            "latency": args.latency,
+            "token_delay": args.token_delay,
+            "rate_limit": args.rate_limit,
+            "sessions_per_level": args.sessions_per_level,
+        },
+        "server": config.stats(),
+        "levels": levels,
+        "saturation": saturation,
+    }
+    output = args.output or os.path.join(
+        BENCH_DIR, "results", f"load-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
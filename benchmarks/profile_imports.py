@@ -0,0 +1,80 @@
+"""
+Cold-start import profile.
+
+Imports each app module in a fresh interpreter with `python -X importtime`
+and reports its total import time and the slowest dependencies it pulls
+in. Run it in a new container image to track how long a replica takes
+before it can serve its first page.
+
+Usage:
+    python benchmarks/profile_imports.py [--modules app chat image_analysis] [--top 10]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+
+# Modules imported by the first render of app.py, then the feature modules
+# that are only imported once a tab is used
+DEFAULT_MODULES = [
+    "config", "theme", "chat_context", "tts_component", "hospital_locator",
+    "chat", "image_analysis", "report_translator",
+]
+
+# import time: self [us] | cumulative | imported package
+_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def profile(module):
+    """Return [(name, depth, cumulative_us)] for importing `module` from scratch"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "unknown error"
+        raise RuntimeError(f"import {module} failed: {error}")
+    entries = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            depth = (len(match.group(3)) - 1) // 2
+            entries.append((match.group(4), depth, int(match.group(2))))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    parser.add_argument("--top", type=int, default=5, help="Slowest top-level dependencies to list per module")
+    args = parser.parse_args()
+
+    print(f"{'module':<22}{'import ms':>12}  slowest dependencies")
+    for module in args.modules:
+        try:
+            entries = profile(module)
+        except RuntimeError as e:
+            print(f"{module:<22}{'-':>12}  {e}")
+            continue
+        end = next((i for i, (name, depth, _) in enumerate(entries) if name == module and depth == 0), None)
+        if end is None:
+            print(f"{module:<22}{'-':>12}  already imported at interpreter startup")
+            continue
+        start = end
+        while start > 0 and entries[start - 1][1] > 0:
+            start -= 1
+        # importtime lists a module after everything it imported, one level deeper
+        direct = sorted(
+            ((name, us) for name, depth, us in entries[start:end] if depth == 1),
+            key=lambda entry: entry[1], reverse=True
+        )[:args.top]
+        total = entries[end][2]
+        slowest = ", ".join(f"{name} {us / 1000:.0f}ms" for name, us in direct)
+        print(f"{module:<22}{total / 1000:>12.1f}  {slowest}")
+
+
+if __name__ == "__main__":
+    main()
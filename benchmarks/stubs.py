@@ -0,0 +1,59 @@
+"""
+Offline stand-ins for GoogleTranslator (deep_translator) and Nominatim (geopy).
+
+install() registers them in sys.modules before the app modules import the
+real packages, so benchmarks never touch the network. Each call sleeps for
+a configurable latency to mimic the remote service.
+"""
+import sys
+import time
+import types
+import zlib
+
+# Seconds per call, adjustable before or after install()
+TRANSLATE_LATENCY = 0.02
+GEOCODE_LATENCY = 0.05
+
+calls = {"translate": 0, "geocode": 0}
+
+
+class GoogleTranslator:
+    def __init__(self, source="auto", target="en"):
+        self.source = source
+        self.target = target
+
+    def translate(self, text):
+        calls["translate"] += 1
+        time.sleep(TRANSLATE_LATENCY)
+        return f"[{self.target}] {text}"
+
+
+class _Location:
+    def __init__(self, latitude, longitude):
+        self.latitude = latitude
+        self.longitude = longitude
+
+
+class Nominatim:
+    def __init__(self, user_agent=None, **kwargs):
+        self.user_agent = user_agent
+
+    def geocode(self, query, timeout=None, **kwargs):
+        calls["geocode"] += 1
+        time.sleep(GEOCODE_LATENCY)
+        # Deterministic point inside India per query
+        digest = zlib.crc32(query.encode("utf-8"))
+        return _Location(8.0 + (digest % 2700) / 100, 68.0 + (digest // 2700 % 2900) / 100)
+
+
+def install():
+    """Register the stand-ins as deep_translator and geopy.geocoders"""
+    deep_translator = types.ModuleType("deep_translator")
+    deep_translator.GoogleTranslator = GoogleTranslator
+    geopy = types.ModuleType("geopy")
+    geocoders = types.ModuleType("geopy.geocoders")
+    geocoders.Nominatim = Nominatim
+    geopy.geocoders = geocoders
+    sys.modules["deep_translator"] = deep_translator
+    sys.modules["geopy"] = geopy
+    sys.modules["geopy.geocoders"] = geocoders